@@ -14,7 +14,7 @@ from app.api.v1.schemas.user import User
 router = APIRouter()
 
 @router.post("/", response_model=Agent, status_code=status.HTTP_201_CREATED)
-async def create_agent(
+def create_agent(
     agent_data: AgentCreate,
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
@@ -44,7 +44,7 @@ async def create_agent(
     return agent
 
 @router.get("/", response_model=List[AgentSummary])
-async def list_agents(
+def list_agents(
     status: Optional[AgentStatusEnum] = Query(None, description="Filtrar por status"),
     category: Optional[AgentCategoryEnum] = Query(None, description="Filtrar por categoria"),
     skip: int = Query(0, ge=0, description="Número de registros para pular"),
@@ -79,7 +79,7 @@ async def list_agents(
     return agents_with_rate
 
 @router.get("/stats", response_model=AgentStats)
-async def get_agent_stats(
+def get_agent_stats(
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
@@ -91,7 +91,7 @@ async def get_agent_stats(
     return stats
 
 @router.get("/{agent_id}", response_model=Agent)
-async def get_agent(
+def get_agent(
     agent_id: int,
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
@@ -118,7 +118,7 @@ async def get_agent(
     return agent
 
 @router.put("/{agent_id}", response_model=Agent)
-async def update_agent(
+def update_agent(
     agent_id: int,
     agent_data: AgentUpdate,
     current_user: User = Depends(get_current_active_user),
@@ -150,7 +150,7 @@ async def update_agent(
     return updated_agent
 
 @router.patch("/{agent_id}/status", response_model=Agent)
-async def update_agent_status(
+def update_agent_status(
     agent_id: int,
     status_data: AgentStatusUpdate,
     current_user: User = Depends(get_current_active_user),
@@ -188,7 +188,7 @@ async def update_agent_status(
     return updated_agent
 
 @router.delete("/{agent_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_agent(
+def delete_agent(
     agent_id: int,
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
@@ -222,7 +222,7 @@ async def delete_agent(
     agent_repo.delete(agent_id)
 
 @router.post("/{agent_id}/clone", response_model=Agent, status_code=status.HTTP_201_CREATED)
-async def clone_agent(
+def clone_agent(
     agent_id: int,
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
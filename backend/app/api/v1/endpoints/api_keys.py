@@ -1,6 +1,9 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi.responses import Response
 from sqlalchemy.orm import Session
 from typing import List, Optional
+from functools import lru_cache
+import orjson
 
 from app.infrastructure.db.database import get_db
 from app.infrastructure.repositories.user_repository import UserRepository
@@ -65,7 +68,7 @@ async def create_api_key(
     return _format_api_key_response(api_key_record, api_key_data.api_key)
 
 @router.get("/", response_model=List[APIKeyWithModels])
-async def list_api_keys(
+def list_api_keys(
     provider: Optional[APIKeyProviderEnum] = Query(None, description="Filtrar por provedor"),
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
@@ -96,7 +99,7 @@ async def list_api_keys(
     return result
 
 @router.get("/stats", response_model=APIKeyStats)
-async def get_api_key_stats(
+def get_api_key_stats(
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
@@ -129,7 +132,7 @@ async def get_api_key_stats(
     )
 
 @router.get("/{key_id}", response_model=APIKey)
-async def get_api_key(
+def get_api_key(
     key_id: int,
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
@@ -151,7 +154,7 @@ async def get_api_key(
     return _format_api_key_response(api_key)
 
 @router.put("/{key_id}", response_model=APIKey)
-async def update_api_key(
+def update_api_key(
     key_id: int,
     api_key_data: APIKeyUpdate,
     current_user: User = Depends(get_current_active_user),
@@ -185,7 +188,7 @@ async def update_api_key(
     return _format_api_key_response(api_key)
 
 @router.delete("/{key_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_api_key(
+def delete_api_key(
     key_id: int,
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
@@ -240,11 +243,9 @@ async def test_api_key(
             "message": "API key is invalid or not working"
         }
 
-@router.get("/providers/available", response_model=dict)
-async def get_available_providers():
-    """
-    Lista todos os provedores de LLM disponíveis.
-    """
+@lru_cache(maxsize=1)
+def _available_providers_body() -> bytes:
+    """Lista de provedores serializada uma única vez (conteúdo estático)"""
     providers = llm_registry.get_available_providers()
     
     provider_info = {}
@@ -256,10 +257,17 @@ async def get_available_providers():
             "supported": True
         }
     
-    return {
+    return orjson.dumps({
         "providers": provider_info,
         "total_providers": len(providers)
-    }
+    })
+
+@router.get("/providers/available", response_model=dict)
+async def get_available_providers():
+    """
+    Lista todos os provedores de LLM disponíveis.
+    """
+    return Response(content=_available_providers_body(), media_type="application/json")
 
 def _format_api_key_response(api_key: APIKeyModel, original_key: str = None) -> dict:
     """Formata resposta da chave de API ocultando a chave real"""
@@ -53,12 +53,18 @@ async def register(
             detail="Invalid or already used license key"
         )
     
-    # Criar usuário
+    # Criar usuário (bcrypt roda fora do event loop)
     user_dict = user_data.dict(exclude={'license_key'})
+    user_dict["hashed_password"] = await AuthService.get_password_hash_async(user_dict.pop("password"))
     user = user_repo.create(user_dict)
     
-    # Ativar licença para o usuário
-    license_repo.activate_license(user_data.license_key, user.id)
+    # Ativar licença para o usuário (claim atômico; outra requisição pode ter usado a chave)
+    if not license_repo.activate_license(user_data.license_key, user.id):
+        user_repo.delete(user.id)
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid or already used license key"
+        )
     
     # Gerar tokens
     access_token = AuthService.create_access_token(data={"sub": str(user.id)})
@@ -84,9 +90,9 @@ async def login(
     """
     user_repo = UserRepository(db)
     
-    # Autenticar usuário
-    user = user_repo.authenticate(user_data.email, user_data.password)
-    if not user:
+    # Autenticar usuário (bcrypt roda fora do event loop)
+    user = user_repo.get_by_email(user_data.email)
+    if not user or not await AuthService.verify_password_async(user_data.password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password"
@@ -120,7 +126,7 @@ async def login(
     }
 
 @router.post("/refresh", response_model=Token)
-async def refresh_token(
+def refresh_token(
     token_data: TokenRefresh,
     db: Session = Depends(get_db)
 ):
@@ -188,14 +194,15 @@ async def change_password(
     user_repo = UserRepository(db)
     
     # Verificar senha atual
-    if not AuthService.verify_password(password_data.current_password, current_user.hashed_password):
+    if not await AuthService.verify_password_async(password_data.current_password, current_user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Incorrect current password"
         )
     
     # Atualizar senha
-    user_repo.update(current_user.id, {"password": password_data.new_password})
+    hashed_password = await AuthService.get_password_hash_async(password_data.new_password)
+    user_repo.update(current_user.id, {"hashed_password": hashed_password})
     
     return {"message": "Password updated successfully"}
 
@@ -21,7 +21,7 @@ from app.domain.models.task import Task as TaskModel, TaskStatus as TaskStatusMo
 router = APIRouter()
 
 @router.post("/execute", response_model=TaskExecution, status_code=status.HTTP_201_CREATED)
-async def execute_task(
+def execute_task(
     task_data: TaskExecute,
     background_tasks: BackgroundTasks,
     current_user: User = Depends(get_current_active_user),
@@ -106,7 +106,7 @@ async def execute_task(
     )
 
 @router.post("/execute-crew", response_model=CrewExecution, status_code=status.HTTP_201_CREATED)
-async def execute_crew(
+def execute_crew(
     crew_data: CrewExecute,
     background_tasks: BackgroundTasks,
     current_user: User = Depends(get_current_active_user),
@@ -312,7 +312,7 @@ async def cancel_task(
     }
 
 @router.get("/stats", response_model=TaskStats)
-async def get_task_stats(
+def get_task_stats(
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
@@ -350,7 +350,7 @@ async def get_task_stats(
     )
 
 @router.get("/performance", response_model=List[AgentPerformance])
-async def get_agent_performance(
+def get_agent_performance(
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
@@ -1,11 +1,11 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Request, Query, BackgroundTasks
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 import logging
 
-from app.infrastructure.db.database import get_db
+from app.infrastructure.db.database import get_async_db, AsyncSessionLocal
 from app.infrastructure.repositories.conversation_repository import ConversationRepository
-from app.infrastructure.repositories.user_repository import UserRepository
 from app.infrastructure.security.dependencies import get_current_active_user
 from app.infrastructure.services.meta_whatsapp_service import meta_whatsapp_service
 from app.infrastructure.services.whatsapp_ai_service import whatsapp_ai_service
@@ -16,6 +16,7 @@ from app.api.v1.schemas.whatsapp import (
     WhatsAppConfig, WebhookValidation, ConversationStatusEnum
 )
 from app.domain.models.conversation import ConversationStatus, ConversationChannel
+from app.domain.models.user import User as UserModel
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -23,8 +24,7 @@ logger = logging.getLogger(__name__)
 @router.post("/webhook")
 async def whatsapp_webhook(
     request: Request,
-    background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db)
+    background_tasks: BackgroundTasks
 ):
     """
     Webhook para receber mensagens do WhatsApp.
@@ -43,8 +43,7 @@ async def whatsapp_webhook(
             for message in messages:
                 background_tasks.add_task(
                     _process_whatsapp_message,
-                    message,
-                    db
+                    message
                 )
         
         return {"status": "success", "messages_processed": len(messages)}
@@ -61,41 +60,33 @@ async def verify_webhook(
     Verificação do webhook do WhatsApp.
     Usado pelo Meta para validar o endpoint.
     """
-    try:
-        # Obter parâmetros de query
-        mode = request.query_params.get("hub.mode")
-        token = request.query_params.get("hub.verify_token")
-        challenge = request.query_params.get("hub.challenge")
-        
-        if mode and token and challenge:
-            # Validar token
-            validated_challenge = await meta_whatsapp_service.validate_webhook(token, challenge)
-            
-            if validated_challenge:
-                return int(challenge)
-            else:
-                raise HTTPException(
-                    status_code=status.HTTP_403_FORBIDDEN,
-                    detail="Invalid verify token"
-                )
-        else:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Missing required parameters"
-            )
-            
-    except Exception as e:
-        logger.error(f"Error verifying webhook: {e}")
+    # Erros inesperados ficam com o handler global (que já registra o log)
+    mode = request.query_params.get("hub.mode")
+    token = request.query_params.get("hub.verify_token")
+    challenge = request.query_params.get("hub.challenge")
+    
+    if not (mode and token and challenge):
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Webhook verification failed"
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Missing required parameters"
+        )
+    
+    # Validar token
+    validated_challenge = await meta_whatsapp_service.validate_webhook(token, challenge)
+    
+    if not validated_challenge:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Invalid verify token"
         )
+    
+    return int(challenge)
 
 @router.post("/send-message", response_model=dict)
 async def send_message(
     message_data: SendMessage,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Envia uma mensagem via WhatsApp.
@@ -118,7 +109,7 @@ async def send_message(
         conversation_repo = ConversationRepository(db)
         
         # Buscar ou criar conversa
-        conversation = conversation_repo.get_conversation_by_phone(
+        conversation = await conversation_repo.get_conversation_by_phone(
             user_id=current_user.id,
             phone_number=message_data.phone_number
         )
@@ -131,10 +122,10 @@ async def send_message(
                 "user_id": current_user.id,
                 "is_ai_handled": False  # Mensagem manual
             }
-            conversation = conversation_repo.create_conversation(conversation_data)
+            conversation = await conversation_repo.create_conversation(conversation_data)
         
         # Adicionar mensagem
-        conversation_repo.add_message({
+        await conversation_repo.add_message({
             "conversation_id": conversation.id,
             "content": message_data.message,
             "role": "agent",
@@ -196,7 +187,7 @@ async def list_conversations(
     skip: int = Query(0, ge=0, description="Número de registros para pular"),
     limit: int = Query(50, ge=1, le=100, description="Número máximo de registros"),
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Lista as conversas do WhatsApp do usuário.
@@ -212,7 +203,7 @@ async def list_conversations(
     if status:
         status_filter = ConversationStatus(status.value)
     
-    conversations = conversation_repo.get_user_conversations(
+    conversations = await conversation_repo.get_user_conversations(
         user_id=current_user.id,
         status=status_filter,
         channel=ConversationChannel.WHATSAPP,
@@ -236,7 +227,7 @@ async def list_conversations(
             "agent_id": conv.agent_id,
             "agent_name": conv.agent.name if conv.agent else None,
             "metadata": conv.metadata or {},
-            "unread_count": conversation_repo.count_unread_messages(conv.id)
+            "unread_count": await conversation_repo.count_unread_messages(conv.id)
         }
         result.append(Conversation(**conv_dict))
     
@@ -246,14 +237,14 @@ async def list_conversations(
 async def get_conversation(
     conversation_id: int,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Obtém detalhes de uma conversa específica com suas mensagens.
     """
     conversation_repo = ConversationRepository(db)
     
-    conversation = conversation_repo.get_conversation_by_id(conversation_id)
+    conversation = await conversation_repo.get_conversation_by_id(conversation_id)
     
     if not conversation:
         raise HTTPException(
@@ -269,7 +260,7 @@ async def get_conversation(
         )
     
     # Obter mensagens
-    messages = conversation_repo.get_conversation_messages(conversation_id)
+    messages = await conversation_repo.get_conversation_messages(conversation_id)
     
     # Montar resposta
     conv_dict = {
@@ -285,7 +276,7 @@ async def get_conversation(
         "agent_id": conversation.agent_id,
         "agent_name": conversation.agent.name if conversation.agent else None,
         "metadata": conversation.metadata or {},
-        "unread_count": conversation_repo.count_unread_messages(conversation.id),
+        "unread_count": await conversation_repo.count_unread_messages(conversation.id),
         "messages": [
             {
                 "id": msg.id,
@@ -307,14 +298,14 @@ async def update_conversation_status(
     conversation_id: int,
     status_data: UpdateConversationStatus,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Atualiza o status de uma conversa.
     """
     conversation_repo = ConversationRepository(db)
     
-    conversation = conversation_repo.get_conversation_by_id(conversation_id)
+    conversation = await conversation_repo.get_conversation_by_id(conversation_id)
     
     if not conversation:
         raise HTTPException(
@@ -333,14 +324,14 @@ async def update_conversation_status(
     
     if status_data.notes:
         # Adicionar nota como mensagem do sistema
-        conversation_repo.add_message({
+        await conversation_repo.add_message({
             "conversation_id": conversation_id,
             "content": f"Nota: {status_data.notes}",
             "role": "system",
             "message_type": "text"
         })
     
-    updated_conversation = conversation_repo.update_conversation(conversation_id, update_data)
+    updated_conversation = await conversation_repo.update_conversation(conversation_id, update_data)
     
     return Conversation(**{
         "id": updated_conversation.id,
@@ -355,7 +346,7 @@ async def update_conversation_status(
         "agent_id": updated_conversation.agent_id,
         "agent_name": updated_conversation.agent.name if updated_conversation.agent else None,
         "metadata": updated_conversation.metadata or {},
-        "unread_count": conversation_repo.count_unread_messages(updated_conversation.id)
+        "unread_count": await conversation_repo.count_unread_messages(updated_conversation.id)
     })
 
 @router.post("/conversations/{conversation_id}/escalate")
@@ -363,14 +354,14 @@ async def escalate_conversation(
     conversation_id: int,
     escalate_data: EscalateConversation,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Escala uma conversa para atendimento humano.
     """
     conversation_repo = ConversationRepository(db)
     
-    conversation = conversation_repo.get_conversation_by_id(conversation_id)
+    conversation = await conversation_repo.get_conversation_by_id(conversation_id)
     
     if not conversation:
         raise HTTPException(
@@ -402,13 +393,13 @@ async def escalate_conversation(
 @router.get("/stats", response_model=ConversationStats)
 async def get_conversation_stats(
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Obtém estatísticas das conversas do WhatsApp.
     """
     conversation_repo = ConversationRepository(db)
-    stats = conversation_repo.get_conversation_stats(current_user.id)
+    stats = await conversation_repo.get_conversation_stats(current_user.id)
     
     return ConversationStats(**stats)
 
@@ -432,25 +423,24 @@ async def get_whatsapp_config(
     )
 
 # Função auxiliar para processar mensagens em background
-async def _process_whatsapp_message(whatsapp_message, db: Session):
+async def _process_whatsapp_message(whatsapp_message):
     """Processa mensagem do WhatsApp em background"""
     try:
-        # Por enquanto, vamos assumir que todas as mensagens são para o primeiro usuário
-        # Em produção, você precisaria implementar lógica para determinar o usuário correto
-        # baseado no número de telefone de destino ou outras informações
-        
-        user_repo = UserRepository(db)
-        users = user_repo.get_all(limit=1)  # Pegar primeiro usuário para demo
-        
-        if users:
-            user = users[0]
-            await whatsapp_ai_service.process_incoming_message(
-                whatsapp_message=whatsapp_message,
-                user_id=user.id,
-                db=db
-            )
-        else:
-            logger.warning("No users found to process WhatsApp message")
+        # Sessão própria: a sessão da requisição já foi encerrada quando a tarefa roda
+        async with AsyncSessionLocal() as db:
+            # Por enquanto, vamos assumir que todas as mensagens são para o primeiro usuário
+            # Em produção, você precisaria implementar lógica para determinar o usuário correto
+            # baseado no número de telefone de destino ou outras informações
+            user = await db.scalar(select(UserModel).order_by(UserModel.id).limit(1))
+            
+            if user:
+                await whatsapp_ai_service.process_incoming_message(
+                    whatsapp_message=whatsapp_message,
+                    user_id=user.id,
+                    db=db
+                )
+            else:
+                logger.warning("No users found to process WhatsApp message")
             
     except Exception as e:
         logger.error(f"Error processing WhatsApp message in background: {e}")
@@ -1,4 +1,4 @@
-from pydantic import BaseModel, EmailStr, Field
+from pydantic import BaseModel, EmailStr, Field, validator
 from typing import Optional
 from datetime import datetime
 
@@ -11,11 +11,20 @@ class UserCreate(BaseModel):
     license_key: str = Field(..., min_length=10)
     company: Optional[str] = Field(None, max_length=255)
     phone: Optional[str] = Field(None, max_length=50)
+    
+    @validator("email")
+    def normalize_email(cls, v):
+        # Normalizado uma vez na entrada: evita contas duplicadas por maiúsculas
+        return v.strip().lower()
 
 class UserLogin(BaseModel):
     """Schema para login"""
     email: EmailStr
     password: str
+    
+    @validator("email")
+    def normalize_email(cls, v):
+        return v.strip().lower()
 
 class UserUpdate(BaseModel):
     """Schema para atualização de usuário"""
@@ -2,7 +2,7 @@ from abc import ABC, abstractmethod
 from typing import Dict, List, Optional, Any
 from dataclasses import dataclass
 
-@dataclass
+@dataclass(slots=True)
 class LLMResponse:
     """Resposta de um LLM"""
     content: str
@@ -13,7 +13,7 @@ class LLMResponse:
     finish_reason: str
     metadata: Dict[str, Any] = None
 
-@dataclass
+@dataclass(slots=True)
 class LLMMessage:
     """Mensagem para o LLM"""
     role: str  # system, user, assistant
@@ -23,6 +23,8 @@ class Settings(BaseSettings):
     POSTGRES_PASSWORD: str = "postgres"
     POSTGRES_DB: str = "ai_agents_platform"
     POSTGRES_PORT: int = 5432
+    # Pular create_all no startup (schema já criado via `alembic upgrade head`)
+    SKIP_DB_CREATE: bool = False
     
     # Segurança - OBRIGATÓRIAS em produção
     SECRET_KEY: Optional[str] = None
@@ -101,6 +103,16 @@ class Settings(BaseSettings):
             return "sqlite:///./ai_agents_platform.db"
         return f"postgresql://{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD}@{self.POSTGRES_SERVER}:{self.POSTGRES_PORT}/{self.POSTGRES_DB}"
     
+    @property
+    def async_database_url(self) -> str:
+        """URL do banco com driver assíncrono (asyncpg / aiosqlite)"""
+        url = self.database_url
+        if url.startswith("postgresql://"):
+            return url.replace("postgresql://", "postgresql+asyncpg://", 1)
+        if url.startswith("sqlite://"):
+            return url.replace("sqlite://", "sqlite+aiosqlite://", 1)
+        return url
+    
     @validator("SECRET_KEY")
     def validate_secret_key(cls, v):
         if v is None:
@@ -4,8 +4,9 @@ Entidade base com comportamentos comuns
 """
 
 from abc import ABC
+from collections import defaultdict
 from datetime import datetime
-from typing import Any, Dict, List, Optional
+from typing import Any, DefaultDict, Dict, List, Optional
 from uuid import UUID, uuid4
 
 from pydantic import BaseModel, Field
@@ -32,9 +33,15 @@ class BaseEntity(ABC):
     - Imutabilidade controlada
     """
     
+    __slots__ = (
+        "_id", "_domain_events", "_events_by_type", "_created_at", "_updated_at", "_version"
+    )
+    
     def __init__(self, entity_id: Optional[str] = None):
         self._id = entity_id or str(uuid4())
         self._domain_events: List[DomainEvent] = []
+        # Índice por event_type para consultas sem varrer a lista inteira
+        self._events_by_type: DefaultDict[str, List[DomainEvent]] = defaultdict(list)
         self._created_at = datetime.utcnow()
         self._updated_at = datetime.utcnow()
         self._version = 1
@@ -64,13 +71,19 @@ class BaseEntity(ABC):
         """Eventos de domínio pendentes"""
         return self._domain_events.copy()
     
+    def events_of_type(self, event_type: str) -> List[DomainEvent]:
+        """Eventos de domínio pendentes de um tipo, em ordem de ocorrência"""
+        return list(self._events_by_type.get(event_type, ()))
+    
     def add_domain_event(self, event: DomainEvent) -> None:
         """Adiciona um evento de domínio"""
         self._domain_events.append(event)
+        self._events_by_type[event.event_type].append(event)
     
     def clear_domain_events(self) -> None:
         """Limpa eventos de domínio após processamento"""
         self._domain_events.clear()
+        self._events_by_type.clear()
     
     def mark_as_modified(self) -> None:
         """Marca entidade como modificada"""
@@ -98,6 +111,8 @@ class AggregateRoot(BaseEntity):
     - Publicar eventos de domínio
     """
     
+    __slots__ = ("_is_deleted",)
+    
     def __init__(self, entity_id: Optional[str] = None):
         super().__init__(entity_id)
         self._is_deleted = False
@@ -123,7 +138,7 @@ class AggregateRoot(BaseEntity):
         ))
 
 
-class ValueObject(BaseModel):
+class ValueObject:
     """
     Objeto de valor DDD
     
@@ -131,15 +146,12 @@ class ValueObject(BaseModel):
     - Imutável
     - Sem identidade
     - Igualdade baseada em valor
-    """
     
-    class Config:
-        frozen = True  # Imutável
-        validate_assignment = True
+    Subclasses usam @dataclass(frozen=True, slots=True): atribuição bloqueada,
+    __eq__/__hash__ por valor e nenhum __dict__ por instância.
+    """
     
-    def __hash__(self) -> int:
-        """Hash baseado nos valores"""
-        return hash(tuple(self.__dict__.values()))
+    __slots__ = ()
 
 
 # Exceções de domínio
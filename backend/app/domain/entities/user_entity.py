@@ -3,12 +3,17 @@ User Entity - DDD Implementation
 Entidade User seguindo padrões Domain-Driven Design
 """
 
+import re
+from dataclasses import dataclass, field
 from datetime import datetime
 from typing import Optional, List
 from enum import Enum
 
 from .base import AggregateRoot, ValueObject, DomainEvent, BusinessRuleViolationException
 
+# Validação básica de email, compilada uma única vez no import
+_EMAIL_RE = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
+
 
 class UserStatus(str, Enum):
     """Status do usuário"""
@@ -26,37 +31,46 @@ class SubscriptionType(str, Enum):
     ENTERPRISE = "enterprise"
 
 
+@dataclass(frozen=True, slots=True)
 class Email(ValueObject):
     """Value Object para email"""
     value: str
     
-    def __init__(self, value: str):
-        import re
-        
+    def __post_init__(self) -> None:
+        value = self.value
         if not value or not isinstance(value, str):
             raise ValueError("Email cannot be empty")
         
         # Validação básica de email
-        email_pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-        if not re.match(email_pattern, value.lower()):
+        normalized = value.lower()
+        if not _EMAIL_RE.match(normalized):
             raise ValueError(f"Invalid email format: {value}")
         
-        super().__init__(value=value.lower())
+        # Dataclass frozen: normalização só via object.__setattr__
+        object.__setattr__(self, "value", normalized)
 
 
+@dataclass(frozen=True, slots=True)
 class UserProfile(ValueObject):
     """Value Object para perfil do usuário"""
     first_name: str
     last_name: str
     company: Optional[str] = None
     phone: Optional[str] = None
+    # Cache de full_name (slots + frozen não suportam functools.cached_property)
+    _full_name: Optional[str] = field(default=None, init=False, repr=False, compare=False)
     
     @property
     def full_name(self) -> str:
-        """Nome completo do usuário"""
-        return f"{self.first_name} {self.last_name}".strip()
+        """Nome completo do usuário (calculado uma vez; o objeto é imutável)"""
+        full_name = self._full_name
+        if full_name is None:
+            full_name = f"{self.first_name} {self.last_name}".strip()
+            object.__setattr__(self, "_full_name", full_name)
+        return full_name
 
 
+@dataclass(frozen=True, slots=True)
 class UserSubscription(ValueObject):
     """Value Object para assinatura"""
     type: SubscriptionType
@@ -92,6 +106,11 @@ class User(AggregateRoot):
     - Histórico de login é mantido
     """
     
+    __slots__ = (
+        "_email", "_profile", "_status", "_subscription", "_password_hash",
+        "_last_login", "_login_count", "_failed_login_attempts", "_locked_until"
+    )
+    
     def __init__(
         self,
         email: Email,
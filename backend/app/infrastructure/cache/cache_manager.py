@@ -3,7 +3,6 @@ Cache Manager - Redis Implementation
 Sistema de cache distribuído com Redis
 """
 
-import json
 import pickle
 from typing import Any, Optional, Union, Dict, List
 from datetime import datetime, timedelta
@@ -11,11 +10,28 @@ from functools import wraps
 import hashlib
 import asyncio
 
+import orjson
 import redis.asyncio as redis
 from pydantic import BaseModel
 
 from app.core.config import settings
 
+# BLAKE2b da stdlib: mais rápido que MD5 em 64 bits e sem problemas com FIPS
+_blake2b = hashlib.blake2b
+
+_JSON_SCALARS = frozenset((str, int, float, bool, type(None)))
+
+
+def _is_plain_json(value: Any) -> bool:
+    """Indica se o valor volta idêntico do JSON (sem datetime, UUID, tuplas, subclasses...)"""
+    if type(value) in _JSON_SCALARS:
+        return True
+    if type(value) is list:
+        return all(_is_plain_json(item) for item in value)
+    if type(value) is dict:
+        return all(type(k) is str and _is_plain_json(v) for k, v in value.items())
+    return False
+
 
 class CacheConfig(BaseModel):
     """Configuração do cache"""
@@ -42,6 +58,9 @@ class CacheManager:
     - Connection pooling
     """
     
+    # Chaves por comando UNLINK em delete_pattern
+    DELETE_BATCH_SIZE = 500
+    
     def __init__(self, config: CacheConfig = None):
         self.config = config or CacheConfig()
         self._redis: Optional[redis.Redis] = None
@@ -87,17 +106,18 @@ class CacheManager:
         """Gera chave única para cache"""
         # Criar hash dos argumentos
         key_data = f"{prefix}:{args}:{sorted(kwargs.items())}"
-        key_hash = hashlib.md5(key_data.encode()).hexdigest()
+        key_hash = _blake2b(key_data.encode(), digest_size=16).hexdigest()
         return f"cache:{prefix}:{key_hash}"
     
     def _serialize_value(self, value: Any) -> bytes:
         """Serializa valor para cache"""
         try:
-            # Tentar JSON primeiro (mais rápido)
-            if isinstance(value, (str, int, float, bool, list, dict)):
-                return json.dumps(value).encode()
+            # JSON só para tipos nativos: o orjson aceitaria datetime/UUID
+            # aninhados, mas eles voltariam como string na leitura
+            if _is_plain_json(value):
+                return orjson.dumps(value)
             else:
-                # Usar pickle para objetos complexos
+                # Usar pickle para objetos complexos (preserva os tipos)
                 return pickle.dumps(value)
         except Exception:
             # Fallback para pickle
@@ -107,8 +127,8 @@ class CacheManager:
         """Deserializa valor do cache"""
         try:
             # Tentar JSON primeiro
-            return json.loads(data.decode())
-        except (json.JSONDecodeError, UnicodeDecodeError):
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
             # Usar pickle
             return pickle.loads(data)
     
@@ -154,6 +174,73 @@ class CacheManager:
             print(f"Cache set error: {e}")
             return False
     
+    async def bulk_get(self, keys: List[str]) -> List[Optional[Any]]:
+        """Recupera vários valores em um único MGET (None para cada miss)"""
+        if not self._redis or not keys:
+            return [None] * len(keys)
+        
+        try:
+            raw_values = await self._redis.mget(keys)
+        except Exception as e:
+            self._metrics["errors"] += 1
+            print(f"Cache bulk_get error: {e}")
+            return [None] * len(keys)
+        
+        deserialize = self._deserialize_value
+        values = [None if data is None else deserialize(data) for data in raw_values]
+        misses = raw_values.count(None)
+        self._metrics["misses"] += misses
+        self._metrics["hits"] += len(raw_values) - misses
+        return values
+    
+    async def bulk_set(self, items: Dict[str, Any], ttl: Optional[int] = None) -> bool:
+        """Armazena vários valores com o mesmo TTL em um único pipeline"""
+        if not self._redis:
+            return False
+        if not items:
+            return True
+        
+        try:
+            ttl = ttl or self.config.default_ttl
+            serialize = self._serialize_value
+            pipe = self._redis.pipeline(transaction=False)
+            for key, value in items.items():
+                pipe.set(key, serialize(value), ex=ttl)
+            await pipe.execute()
+            self._metrics["sets"] += len(items)
+            return True
+            
+        except Exception as e:
+            self._metrics["errors"] += 1
+            print(f"Cache bulk_set error: {e}")
+            return False
+    
+    async def set_if_absent(
+        self,
+        key: str,
+        value: Any,
+        ttl: Optional[int] = None
+    ) -> Optional[bool]:
+        """Armazena valor apenas se a chave não existir (SET NX EX).
+
+        Retorna True se gravou, False se a chave já existia e None se o
+        Redis não estiver disponível.
+        """
+        if not self._redis:
+            return None
+        
+        try:
+            ttl = ttl or self.config.default_ttl
+            result = await self._redis.set(key, self._serialize_value(value), nx=True, ex=ttl)
+            if result:
+                self._metrics["sets"] += 1
+            return bool(result)
+            
+        except Exception as e:
+            self._metrics["errors"] += 1
+            print(f"Cache set_if_absent error: {e}")
+            return None
+    
     async def delete(self, key: str) -> bool:
         """Remove valor do cache"""
         if not self._redis:
@@ -175,12 +262,20 @@ class CacheManager:
             return 0
         
         try:
-            keys = await self._redis.keys(pattern)
-            if keys:
-                deleted = await self._redis.delete(*keys)
-                self._metrics["deletes"] += deleted
-                return deleted
-            return 0
+            # SCAN incremental (KEYS bloqueia o Redis) e UNLINK em lotes num único pipeline
+            pipe = self._redis.pipeline(transaction=False)
+            batch = []
+            async for key in self._redis.scan_iter(match=pattern, count=1000):
+                batch.append(key)
+                if len(batch) == self.DELETE_BATCH_SIZE:
+                    pipe.unlink(*batch)
+                    batch = []
+            if batch:
+                pipe.unlink(*batch)
+            
+            deleted = sum(await pipe.execute())
+            self._metrics["deletes"] += deleted
+            return deleted
             
         except Exception as e:
             self._metrics["errors"] += 1
@@ -197,6 +292,19 @@ class CacheManager:
         except Exception:
             return False
     
+    async def exists_many(self, keys: List[str]) -> List[bool]:
+        """Verifica várias chaves em um único round-trip (pipeline de EXISTS)"""
+        if not self._redis or not keys:
+            return [False] * len(keys)
+        
+        try:
+            pipe = self._redis.pipeline(transaction=False)
+            for key in keys:
+                pipe.exists(key)
+            return [count > 0 for count in await pipe.execute()]
+        except Exception:
+            return [False] * len(keys)
+    
     async def get_ttl(self, key: str) -> int:
         """Retorna TTL da chave"""
         if not self._redis:
@@ -352,8 +460,163 @@ class AgentCache:
 class LLMCache:
     """Cache específico para resultados de LLM"""
     
+    @staticmethod
+    def prompt_hash(prompt: str) -> str:
+        """Hash não criptográfico do prompt usado como chave de cache"""
+        return _blake2b(prompt.encode(), digest_size=16).hexdigest()
+    
     @staticmethod
     @cache_result("llm_response", ttl=3600)  # 1 hora
     async def get_llm_response(prompt_hash: str):
         """Cache para respostas de LLM"""
         pass
+
+
+class ConversationCache:
+    """Cache do histórico recente de conversas (lista Redis em ordem cronológica)"""
+    
+    HISTORY_SIZE = 10
+    TTL = 300  # 5 minutos
+    
+    @staticmethod
+    def _key(conversation_id: int) -> str:
+        return f"conv:{conversation_id}:recent"
+    
+    @staticmethod
+    async def get_recent_messages(
+        conversation_id: int,
+        exclude_latest: bool = False
+    ) -> Optional[List[Dict[str, str]]]:
+        """Retorna o histórico em cache (mais antigo primeiro) ou None se não houver"""
+        if not cache_manager._redis:
+            return None
+        
+        key = ConversationCache._key(conversation_id)
+        try:
+            # Com exclude_latest a última mensagem (a atual) fica de fora já no LRANGE
+            pipe = cache_manager._redis.pipeline(transaction=False)
+            pipe.exists(key)
+            pipe.lrange(key, -ConversationCache.HISTORY_SIZE, -2 if exclude_latest else -1)
+            exists, items = await pipe.execute()
+            if not exists:
+                cache_manager._metrics["misses"] += 1
+                return None
+            
+            cache_manager._metrics["hits"] += 1
+            return [orjson.loads(item) for item in items]
+            
+        except Exception as e:
+            cache_manager._metrics["errors"] += 1
+            print(f"Conversation cache get error: {e}")
+            return None
+    
+    @staticmethod
+    async def set_recent_messages(conversation_id: int, messages: List[Dict[str, str]]) -> bool:
+        """Substitui o histórico em cache (mensagens em ordem cronológica)"""
+        if not cache_manager._redis or not messages:
+            return False
+        
+        key = ConversationCache._key(conversation_id)
+        try:
+            pipe = cache_manager._redis.pipeline(transaction=True)
+            pipe.delete(key)
+            pipe.rpush(key, *[orjson.dumps(m) for m in messages[-ConversationCache.HISTORY_SIZE:]])
+            pipe.expire(key, ConversationCache.TTL)
+            await pipe.execute()
+            cache_manager._metrics["sets"] += 1
+            return True
+            
+        except Exception as e:
+            cache_manager._metrics["errors"] += 1
+            print(f"Conversation cache set error: {e}")
+            return False
+    
+    @staticmethod
+    async def push_message(conversation_id: int, role: str, content: str) -> bool:
+        """Adiciona mensagem ao histórico em cache, se ele já existir"""
+        if not cache_manager._redis:
+            return False
+        
+        key = ConversationCache._key(conversation_id)
+        try:
+            # RPUSHX evita criar um histórico parcial quando a chave não existe
+            pipe = cache_manager._redis.pipeline(transaction=True)
+            pipe.rpushx(key, orjson.dumps({"role": role, "content": content}))
+            pipe.ltrim(key, -ConversationCache.HISTORY_SIZE, -1)
+            pipe.expire(key, ConversationCache.TTL)
+            await pipe.execute()
+            return True
+            
+        except Exception as e:
+            cache_manager._metrics["errors"] += 1
+            print(f"Conversation cache push error: {e}")
+            return False
+
+
+class AgentLoadCache:
+    """Ranking de agentes por carga de trabalho (sorted set Redis por usuário)"""
+    
+    TTL = 60  # mudanças de status dos agentes refletem em até 1 minuto
+    
+    @staticmethod
+    def _key(user_id: int) -> str:
+        return f"user:{user_id}:agents"
+    
+    @staticmethod
+    async def get_least_loaded(user_id: int, count: int = 10) -> Optional[List[int]]:
+        """Retorna os IDs dos agentes com menor carga ou None se não houver ranking"""
+        if not cache_manager._redis:
+            return None
+        
+        try:
+            ids = await cache_manager._redis.zrange(AgentLoadCache._key(user_id), 0, count - 1)
+            if not ids:
+                cache_manager._metrics["misses"] += 1
+                return None
+            
+            cache_manager._metrics["hits"] += 1
+            return [int(agent_id) for agent_id in ids]
+            
+        except Exception as e:
+            cache_manager._metrics["errors"] += 1
+            print(f"Agent load cache get error: {e}")
+            return None
+    
+    @staticmethod
+    async def set_loads(user_id: int, loads: Dict[int, int]) -> bool:
+        """Substitui o ranking do usuário (agent_id -> carga)"""
+        if not cache_manager._redis or not loads:
+            return False
+        
+        key = AgentLoadCache._key(user_id)
+        try:
+            pipe = cache_manager._redis.pipeline(transaction=True)
+            pipe.delete(key)
+            pipe.zadd(key, loads)
+            pipe.expire(key, AgentLoadCache.TTL)
+            await pipe.execute()
+            cache_manager._metrics["sets"] += 1
+            return True
+            
+        except Exception as e:
+            cache_manager._metrics["errors"] += 1
+            print(f"Agent load cache set error: {e}")
+            return False
+    
+    @staticmethod
+    async def increment(user_id: int, agent_id: int, amount: int = 1) -> bool:
+        """Incrementa a carga de um agente já presente no ranking"""
+        if not cache_manager._redis:
+            return False
+        
+        try:
+            # XX: não recria o ranking parcial quando a chave já expirou
+            await cache_manager._redis.zadd(
+                AgentLoadCache._key(user_id), {agent_id: amount}, xx=True, incr=True
+            )
+            return True
+            
+        except Exception as e:
+            cache_manager._metrics["errors"] += 1
+            print(f"Agent load cache increment error: {e}")
+            return False
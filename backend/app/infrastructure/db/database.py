@@ -1,7 +1,8 @@
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session
-from typing import Generator
+from typing import AsyncGenerator, Generator
 import logging
 
 from app.core.config import settings
@@ -19,6 +20,26 @@ engine = create_engine(
 # Criar SessionLocal
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Engine assíncrona para os fluxos que rodam no event loop (WhatsApp/IA)
+_async_pool_options = (
+    {} if settings.async_database_url.startswith("sqlite")
+    else {"pool_size": 20, "max_overflow": 10}
+)
+async_engine = create_async_engine(
+    settings.async_database_url,
+    pool_pre_ping=True,
+    pool_recycle=300,
+    echo=settings.DEBUG,
+    **_async_pool_options
+)
+
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False
+)
+
 # Base para modelos
 Base = declarative_base()
 
@@ -38,6 +59,20 @@ def get_db() -> Generator[Session, None, None]:
     finally:
         db.close()
 
+# Dependency para obter sessão assíncrona do banco
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    """
+    Dependency que fornece uma sessão assíncrona do banco de dados.
+    Automaticamente fecha a sessão após o uso.
+    """
+    async with AsyncSessionLocal() as db:
+        try:
+            yield db
+        except Exception as e:
+            logger.error(f"Database error: {e}")
+            await db.rollback()
+            raise
+
 # Função para testar conexão
 def test_connection():
     """Testa a conexão com o banco de dados"""
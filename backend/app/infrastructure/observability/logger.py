@@ -7,7 +7,7 @@ import json
 import logging
 import sys
 import time
-import uuid
+import secrets
 from contextvars import ContextVar
 from datetime import datetime
 from typing import Any, Dict, Optional
@@ -384,8 +384,8 @@ class LoggingMiddleware:
             await self.app(scope, receive, send)
             return
         
-        # Gerar ID de request
-        request_id = str(uuid.uuid4())
+        # Gerar ID de request (um único os.urandom, sem objeto UUID)
+        request_id = secrets.token_hex(16)
         request_id_ctx.set(request_id)
         
         start_time = time.time()
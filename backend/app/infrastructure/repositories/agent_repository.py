@@ -22,6 +22,12 @@ class AgentRepository:
         """Busca agente por ID"""
         return self.db.query(Agent).filter(Agent.id == agent_id).first()
     
+    def get_by_ids(self, agent_ids: List[int]) -> List[Agent]:
+        """Busca vários agentes por ID em uma única consulta"""
+        if not agent_ids:
+            return []
+        return self.db.query(Agent).filter(Agent.id.in_(agent_ids)).all()
+    
     def get_by_user_id(self, user_id: int, skip: int = 0, limit: int = 100) -> List[Agent]:
         """Lista agentes de um usuário"""
         return self.db.query(Agent).filter(
@@ -92,7 +98,14 @@ class AgentRepository:
         """Pausa um agente"""
         return self.update(agent_id, {"status": AgentStatus.PAUSED})
     
-    def update_metrics(self, agent_id: int, task_completed: bool, tokens_used: int, cost: float) -> Optional[Agent]:
+    def update_metrics(
+        self,
+        agent_id: int,
+        task_completed: bool,
+        tokens_used: int,
+        cost: float,
+        commit: bool = True
+    ) -> Optional[Agent]:
         """Atualiza métricas do agente após execução de tarefa"""
         agent = self.get_by_id(agent_id)
         if not agent:
@@ -109,6 +122,11 @@ class AgentRepository:
         from datetime import datetime
         agent.last_active = datetime.utcnow()
         
+        if not commit:
+            # O chamador confirma junto com as demais escritas da transação
+            self.db.flush()
+            return agent
+        
         self.db.commit()
         self.db.refresh(agent)
         return agent
@@ -1,6 +1,7 @@
 from typing import Optional, List
-from sqlalchemy.orm import Session
-from sqlalchemy import and_, desc, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from sqlalchemy import and_, desc, func, select, delete, update
 from datetime import datetime, timedelta
 
 from app.domain.models.conversation import Conversation, Message, ConversationStatus, ConversationChannel, MessageRole
@@ -9,40 +10,51 @@ from app.domain.models.user import User
 class ConversationRepository:
     """Repository para operações com conversas"""
     
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.db = db
     
-    def create_conversation(self, conversation_data: dict) -> Conversation:
+    async def create_conversation(self, conversation_data: dict) -> Conversation:
         """Cria uma nova conversa"""
         conversation = Conversation(**conversation_data)
         self.db.add(conversation)
-        self.db.commit()
-        self.db.refresh(conversation)
+        await self.db.commit()
+        await self.db.refresh(conversation)
         return conversation
     
-    def get_conversation_by_id(self, conversation_id: int) -> Optional[Conversation]:
+    async def get_conversation_by_id(self, conversation_id: int) -> Optional[Conversation]:
         """Busca conversa por ID"""
-        return self.db.query(Conversation).filter(Conversation.id == conversation_id).first()
+        result = await self.db.execute(
+            select(Conversation)
+            .options(selectinload(Conversation.agent))
+            .where(Conversation.id == conversation_id)
+        )
+        return result.scalars().first()
     
-    def get_conversation_by_phone(self, user_id: int, phone_number: str) -> Optional[Conversation]:
+    async def get_conversation_by_phone(self, user_id: int, phone_number: str) -> Optional[Conversation]:
         """Busca conversa por número de telefone"""
-        return self.db.query(Conversation).filter(
-            and_(
-                Conversation.user_id == user_id,
-                Conversation.customer_phone == phone_number
+        result = await self.db.execute(
+            select(Conversation).where(
+                and_(
+                    Conversation.user_id == user_id,
+                    Conversation.customer_phone == phone_number
+                )
             )
-        ).first()
+        )
+        return result.scalars().first()
     
-    def get_conversation_by_external_id(self, external_id: str, channel: ConversationChannel) -> Optional[Conversation]:
+    async def get_conversation_by_external_id(self, external_id: str, channel: ConversationChannel) -> Optional[Conversation]:
         """Busca conversa por ID externo"""
-        return self.db.query(Conversation).filter(
-            and_(
-                Conversation.external_id == external_id,
-                Conversation.channel == channel
+        result = await self.db.execute(
+            select(Conversation).where(
+                and_(
+                    Conversation.external_id == external_id,
+                    Conversation.channel == channel
+                )
             )
-        ).first()
+        )
+        return result.scalars().first()
     
-    def get_user_conversations(
+    async def get_user_conversations(
         self, 
         user_id: int, 
         status: Optional[ConversationStatus] = None,
@@ -51,136 +63,196 @@ class ConversationRepository:
         limit: int = 100
     ) -> List[Conversation]:
         """Lista conversas de um usuário"""
-        query = self.db.query(Conversation).filter(Conversation.user_id == user_id)
+        query = (
+            select(Conversation)
+            .options(selectinload(Conversation.agent))
+            .where(Conversation.user_id == user_id)
+        )
         
         if status:
-            query = query.filter(Conversation.status == status)
+            query = query.where(Conversation.status == status)
         
         if channel:
-            query = query.filter(Conversation.channel == channel)
+            query = query.where(Conversation.channel == channel)
         
-        return query.order_by(desc(Conversation.last_message_at)).offset(skip).limit(limit).all()
+        result = await self.db.execute(
+            query.order_by(desc(Conversation.last_message_at)).offset(skip).limit(limit)
+        )
+        return result.scalars().all()
     
-    def get_active_conversations(self, user_id: int) -> List[Conversation]:
+    async def get_active_conversations(self, user_id: int) -> List[Conversation]:
         """Lista conversas ativas de um usuário"""
-        return self.get_user_conversations(
+        return await self.get_user_conversations(
             user_id=user_id,
             status=ConversationStatus.ACTIVE
         )
     
-    def get_pending_conversations(self, user_id: int) -> List[Conversation]:
+    async def get_pending_conversations(self, user_id: int) -> List[Conversation]:
         """Lista conversas pendentes de um usuário"""
-        return self.get_user_conversations(
+        return await self.get_user_conversations(
             user_id=user_id,
             status=ConversationStatus.PENDING
         )
     
-    def update_conversation(self, conversation_id: int, conversation_data: dict) -> Optional[Conversation]:
+    async def update_conversation(
+        self,
+        conversation_id: int,
+        conversation_data: dict,
+        commit: bool = True
+    ) -> Optional[Conversation]:
         """Atualiza uma conversa"""
-        conversation = self.get_conversation_by_id(conversation_id)
+        conversation = await self.get_conversation_by_id(conversation_id)
         if not conversation:
             return None
         
         for field, value in conversation_data.items():
             setattr(conversation, field, value)
         
-        self.db.commit()
-        self.db.refresh(conversation)
+        if not commit:
+            await self.db.flush()
+            return conversation
+        
+        await self.db.commit()
+        await self.db.refresh(conversation)
         return conversation
     
-    def update_last_message_time(self, conversation_id: int) -> Optional[Conversation]:
+    async def update_last_message_time(self, conversation_id: int) -> Optional[Conversation]:
         """Atualiza timestamp da última mensagem"""
-        return self.update_conversation(conversation_id, {
+        return await self.update_conversation(conversation_id, {
             "last_message_at": datetime.utcnow()
         })
     
-    def mark_as_resolved(self, conversation_id: int) -> Optional[Conversation]:
+    async def mark_as_resolved(self, conversation_id: int) -> Optional[Conversation]:
         """Marca conversa como resolvida"""
-        return self.update_conversation(conversation_id, {
+        return await self.update_conversation(conversation_id, {
             "status": ConversationStatus.RESOLVED
         })
     
-    def mark_as_escalated(self, conversation_id: int) -> Optional[Conversation]:
+    async def mark_as_escalated(self, conversation_id: int) -> Optional[Conversation]:
         """Marca conversa como escalada para humano"""
-        return self.update_conversation(conversation_id, {
+        return await self.update_conversation(conversation_id, {
             "status": ConversationStatus.ESCALATED,
             "requires_human": True
         })
     
-    def assign_agent(self, conversation_id: int, agent_id: int) -> Optional[Conversation]:
+    async def assign_agent(self, conversation_id: int, agent_id: int, commit: bool = True) -> Optional[Conversation]:
         """Atribui um agente à conversa"""
-        return self.update_conversation(conversation_id, {
+        return await self.update_conversation(conversation_id, {
             "agent_id": agent_id,
             "is_ai_handled": True
-        })
+        }, commit=commit)
     
-    def add_message(self, message_data: dict) -> Message:
+    async def add_message(self, message_data: dict, commit: bool = True) -> Message:
         """Adiciona uma mensagem à conversa"""
         message = Message(**message_data)
         self.db.add(message)
-        self.db.commit()
-        self.db.refresh(message)
         
-        # Atualizar timestamp da conversa
-        self.update_last_message_time(message.conversation_id)
+        # Atualizar timestamp da conversa na mesma transação
+        await self.db.execute(
+            update(Conversation)
+            .where(Conversation.id == message.conversation_id)
+            .values(last_message_at=func.now())
+        )
+        
+        if not commit:
+            # O chamador confirma junto com as demais escritas da transação
+            await self.db.flush()
+            return message
         
+        await self.db.commit()
+        await self.db.refresh(message)
         return message
     
-    def get_conversation_messages(
+    async def get_conversation_messages(
         self, 
         conversation_id: int, 
         skip: int = 0, 
         limit: int = 50
     ) -> List[Message]:
         """Obtém mensagens de uma conversa"""
-        return self.db.query(Message).filter(
-            Message.conversation_id == conversation_id
-        ).order_by(Message.created_at).offset(skip).limit(limit).all()
+        result = await self.db.execute(
+            select(Message)
+            .where(Message.conversation_id == conversation_id)
+            .order_by(Message.created_at)
+            .offset(skip)
+            .limit(limit)
+        )
+        return result.scalars().all()
     
-    def get_recent_messages(
+    async def get_recent_messages(
         self, 
         conversation_id: int, 
         limit: int = 10
     ) -> List[Message]:
         """Obtém mensagens recentes de uma conversa"""
-        return self.db.query(Message).filter(
-            Message.conversation_id == conversation_id
-        ).order_by(desc(Message.created_at)).limit(limit).all()
+        result = await self.db.execute(
+            select(Message)
+            .where(Message.conversation_id == conversation_id)
+            .order_by(desc(Message.created_at))
+            .limit(limit)
+        )
+        return result.scalars().all()
     
-    def get_message_by_external_id(self, external_id: str) -> Optional[Message]:
+    async def get_history_before(
+        self,
+        conversation_id: int,
+        before_message_id: int,
+        limit: int = 10
+    ) -> List[Message]:
+        """Obtém as últimas mensagens anteriores a uma mensagem, em ordem cronológica"""
+        latest_ids = (
+            select(Message.id)
+            .where(
+                and_(
+                    Message.conversation_id == conversation_id,
+                    Message.id < before_message_id
+                )
+            )
+            .order_by(desc(Message.id))
+            .limit(limit)
+            .subquery()
+        )
+        result = await self.db.execute(
+            select(Message)
+            .where(Message.id.in_(select(latest_ids.c.id)))
+            .order_by(Message.id)
+        )
+        return result.scalars().all()
+    
+    async def get_message_by_external_id(self, external_id: str) -> Optional[Message]:
         """Busca mensagem por ID externo"""
-        return self.db.query(Message).filter(Message.external_id == external_id).first()
+        result = await self.db.execute(
+            select(Message).where(Message.external_id == external_id)
+        )
+        return result.scalars().first()
     
-    def count_unread_messages(self, conversation_id: int) -> int:
+    async def count_unread_messages(self, conversation_id: int) -> int:
         """Conta mensagens não lidas de clientes"""
         # Considera não lidas as mensagens de clientes após a última mensagem do agente
-        last_agent_message = self.db.query(Message).filter(
-            and_(
-                Message.conversation_id == conversation_id,
-                Message.role == MessageRole.AGENT
-            )
-        ).order_by(desc(Message.created_at)).first()
-        
-        if last_agent_message:
-            return self.db.query(Message).filter(
+        last_agent_at = await self.db.scalar(
+            select(func.max(Message.created_at)).where(
                 and_(
                     Message.conversation_id == conversation_id,
-                    Message.role == MessageRole.CUSTOMER,
-                    Message.created_at > last_agent_message.created_at
+                    Message.role == MessageRole.AGENT
                 )
-            ).count()
-        else:
-            # Se não há mensagens do agente, contar todas as mensagens do cliente
-            return self.db.query(Message).filter(
-                and_(
-                    Message.conversation_id == conversation_id,
-                    Message.role == MessageRole.CUSTOMER
-                )
-            ).count()
+            )
+        )
+        
+        conditions = [
+            Message.conversation_id == conversation_id,
+            Message.role == MessageRole.CUSTOMER
+        ]
+        if last_agent_at is not None:
+            conditions.append(Message.created_at > last_agent_at)
+        
+        # Se não há mensagens do agente, contar todas as mensagens do cliente
+        return await self.db.scalar(
+            select(func.count(Message.id)).where(and_(*conditions))
+        )
     
-    def get_conversation_stats(self, user_id: int) -> dict:
+    async def get_conversation_stats(self, user_id: int) -> dict:
         """Obtém estatísticas das conversas do usuário"""
-        conversations = self.get_user_conversations(user_id)
+        conversations = await self.get_user_conversations(user_id)
         
         total_conversations = len(conversations)
         active_conversations = len([c for c in conversations if c.status == ConversationStatus.ACTIVE])
@@ -205,42 +277,48 @@ class ConversationRepository:
             "ai_automation_rate": (ai_handled / total_conversations * 100) if total_conversations > 0 else 0
         }
     
-    def get_conversations_needing_attention(self, user_id: int, hours: int = 24) -> List[Conversation]:
+    async def get_conversations_needing_attention(self, user_id: int, hours: int = 24) -> List[Conversation]:
         """Obtém conversas que precisam de atenção (sem resposta há X horas)"""
         cutoff_time = datetime.utcnow() - timedelta(hours=hours)
         
-        return self.db.query(Conversation).filter(
-            and_(
-                Conversation.user_id == user_id,
-                Conversation.status.in_([ConversationStatus.ACTIVE, ConversationStatus.PENDING]),
-                Conversation.last_message_at < cutoff_time
-            )
-        ).order_by(Conversation.last_message_at).all()
+        result = await self.db.execute(
+            select(Conversation).where(
+                and_(
+                    Conversation.user_id == user_id,
+                    Conversation.status.in_([ConversationStatus.ACTIVE, ConversationStatus.PENDING]),
+                    Conversation.last_message_at < cutoff_time
+                )
+            ).order_by(Conversation.last_message_at)
+        )
+        return result.scalars().all()
     
-    def search_conversations(
+    async def search_conversations(
         self, 
         user_id: int, 
         query: str, 
         limit: int = 20
     ) -> List[Conversation]:
         """Busca conversas por nome do cliente ou conteúdo"""
-        return self.db.query(Conversation).filter(
-            and_(
-                Conversation.user_id == user_id,
-                func.lower(Conversation.customer_name).contains(query.lower())
-            )
-        ).order_by(desc(Conversation.last_message_at)).limit(limit).all()
+        result = await self.db.execute(
+            select(Conversation).where(
+                and_(
+                    Conversation.user_id == user_id,
+                    func.lower(Conversation.customer_name).contains(query.lower())
+                )
+            ).order_by(desc(Conversation.last_message_at)).limit(limit)
+        )
+        return result.scalars().all()
     
-    def delete_conversation(self, conversation_id: int) -> bool:
+    async def delete_conversation(self, conversation_id: int) -> bool:
         """Deleta uma conversa e suas mensagens"""
-        conversation = self.get_conversation_by_id(conversation_id)
+        conversation = await self.get_conversation_by_id(conversation_id)
         if not conversation:
             return False
         
         # Deletar mensagens primeiro
-        self.db.query(Message).filter(Message.conversation_id == conversation_id).delete()
+        await self.db.execute(delete(Message).where(Message.conversation_id == conversation_id))
         
         # Deletar conversa
-        self.db.delete(conversation)
-        self.db.commit()
+        await self.db.delete(conversation)
+        await self.db.commit()
         return True
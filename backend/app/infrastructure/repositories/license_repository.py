@@ -1,5 +1,6 @@
 from typing import Optional, List
 from sqlalchemy.orm import Session
+from sqlalchemy import update, and_, select, insert
 from datetime import datetime
 
 from app.domain.models.license import License, LicenseStatus
@@ -11,7 +12,7 @@ class LicenseRepository:
     def __init__(self, db: Session):
         self.db = db
     
-    def create(self, license_data: dict) -> License:
+    def create(self, license_data: dict, commit: bool = True) -> License:
         """Cria uma nova licença"""
         # Gerar chave se não fornecida
         if 'license_key' not in license_data:
@@ -19,10 +20,29 @@ class LicenseRepository:
         
         license = License(**license_data)
         self.db.add(license)
+        
+        if not commit:
+            # O chamador confirma junto com as demais escritas da transação
+            self.db.flush()
+            return license
+        
         self.db.commit()
         self.db.refresh(license)
         return license
     
+    def bulk_create(self, licenses_data: List[dict]) -> List[str]:
+        """Cria várias licenças com um único INSERT em lote e retorna as chaves"""
+        rows = [
+            data if 'license_key' in data else {**data, 'license_key': generate_license_key()}
+            for data in licenses_data
+        ]
+        if not rows:
+            return []
+        
+        self.db.execute(insert(License), rows)
+        self.db.commit()
+        return [row['license_key'] for row in rows]
+    
     def get_by_id(self, license_id: int) -> Optional[License]:
         """Busca licença por ID"""
         return self.db.query(License).filter(License.id == license_id).first()
@@ -60,21 +80,30 @@ class LicenseRepository:
     
     def activate_license(self, license_key: str, user_id: int) -> Optional[License]:
         """Ativa uma licença para um usuário"""
-        license = self.get_by_key(license_key)
-        if not license:
-            return None
+        # Verificação e ativação em um único UPDATE atômico: duas requisições
+        # concorrentes nunca conseguem ativar a mesma chave
+        claimed_id = self.db.execute(
+            update(License)
+            .where(
+                and_(
+                    License.license_key == license_key,
+                    License.status == LicenseStatus.AVAILABLE
+                )
+            )
+            .values(
+                status=LicenseStatus.ACTIVE,
+                user_id=user_id,
+                activated_at=datetime.utcnow()
+            )
+            .returning(License.id)
+            .execution_options(synchronize_session=False)
+        ).scalar_one_or_none()
+        self.db.commit()
         
-        if license.status != LicenseStatus.AVAILABLE:
+        if claimed_id is None:
             return None
         
-        # Ativar licença
-        license.status = LicenseStatus.ACTIVE
-        license.user_id = user_id
-        license.activated_at = datetime.utcnow()
-        
-        self.db.commit()
-        self.db.refresh(license)
-        return license
+        return self.get_by_id(claimed_id)
     
     def revoke_license(self, license_id: int) -> Optional[License]:
         """Revoga uma licença"""
@@ -86,8 +115,17 @@ class LicenseRepository:
     
     def validate_license_key(self, license_key: str) -> bool:
         """Valida se uma chave de licença existe e está disponível"""
-        license = self.get_by_key(license_key)
-        return license is not None and license.status == LicenseStatus.AVAILABLE
+        # Status filtrado no banco: uma sonda pelo índice, sem carregar a entidade
+        return self.db.execute(
+            select(License.id)
+            .where(
+                and_(
+                    License.license_key == license_key,
+                    License.status == LicenseStatus.AVAILABLE
+                )
+            )
+            .limit(1)
+        ).first() is not None
     
     def create_from_webhook(self, webhook_data: dict) -> License:
         """Cria licença a partir de dados de webhook"""
@@ -1,5 +1,7 @@
+import asyncio
+import time
 from datetime import datetime, timedelta
-from typing import Optional, Union
+from typing import Dict, Optional, Tuple, Union
 import secrets
 import string
 import re
@@ -16,6 +18,26 @@ pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 # Configuração da criptografia para chaves de API
 fernet = Fernet(get_encryption_key())
 
+# Cache de tokens já validados: token -> (payload, expiração em epoch)
+_jwt_cache: Dict[str, Tuple[dict, float]] = {}
+_JWT_CACHE_MAX_SIZE = 10000
+
+# Validações de claims montadas uma única vez: nossos tokens só usam sub/exp/type
+_JWT_DECODE_OPTIONS = {
+    "verify_signature": True,
+    "verify_exp": True,
+    "verify_aud": False,
+    "verify_iat": False,
+    "verify_nbf": False,
+    "verify_iss": False,
+    "verify_sub": False,
+    "verify_jti": False,
+    "verify_at_hash": False,
+    "require_exp": True,
+    "require_sub": True,
+    "leeway": 0,
+}
+
 class AuthService:
     """Serviço de autenticação e segurança"""
     
@@ -29,6 +51,16 @@ class AuthService:
         """Gera hash da senha"""
         return pwd_context.hash(password)
     
+    @staticmethod
+    async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+        """Verifica a senha em uma thread, sem bloquear o event loop"""
+        return await asyncio.to_thread(pwd_context.verify, plain_password, hashed_password)
+    
+    @staticmethod
+    async def get_password_hash_async(password: str) -> str:
+        """Gera hash da senha em uma thread, sem bloquear o event loop"""
+        return await asyncio.to_thread(pwd_context.hash, password)
+    
     @staticmethod
     def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
         """Cria token de acesso JWT"""
@@ -55,11 +87,23 @@ class AuthService:
     @staticmethod
     def verify_token(token: str) -> Optional[dict]:
         """Verifica e decodifica token JWT"""
+        cached = _jwt_cache.get(token)
+        if cached and cached[1] > time.time():
+            return cached[0]
+        
         try:
-            payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-            return payload
+            payload = jwt.decode(
+                token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM], options=_JWT_DECODE_OPTIONS
+            )
         except JWTError:
             return None
+        
+        # exp é obrigatório; o limite evita crescimento indefinido do cache
+        if len(_jwt_cache) >= _JWT_CACHE_MAX_SIZE:
+            _jwt_cache.clear()
+        _jwt_cache[token] = (payload, float(payload["exp"]))
+        
+        return payload
     
     @staticmethod
     def encrypt_api_key(api_key: str) -> str:
@@ -31,19 +31,24 @@ class AnthropicService(ILLMService):
     ) -> LLMResponse:
         """Gera uma resposta de chat usando Anthropic"""
         try:
-            # Separar system message das outras mensagens
-            system_message = ""
+            # Anthropic não expõe chave de cache de prompt; o prefixo estável basta
+            kwargs.pop("prompt_cache_key", None)
+            
+            # Separar system messages das outras mensagens
+            system_parts = []
             chat_messages = []
             
             for msg in messages:
                 if msg.role == "system":
-                    system_message = msg.content
+                    system_parts.append(msg.content)
                 else:
                     chat_messages.append({
                         "role": msg.role,
                         "content": msg.content
                     })
             
+            system_message = "\n\n".join(system_parts)
+            
             # Fazer requisição
             response = await self.client.messages.create(
                 model=model,
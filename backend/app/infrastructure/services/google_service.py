@@ -31,6 +31,9 @@ class GoogleService(ILLMService):
     ) -> LLMResponse:
         """Gera uma resposta de chat usando Google Gemini"""
         try:
+            # Gemini não aceita chave de cache de prompt
+            kwargs.pop("prompt_cache_key", None)
+            
             # Configurar modelo
             generation_config = genai.types.GenerationConfig(
                 temperature=temperature,
@@ -45,16 +48,18 @@ class GoogleService(ILLMService):
             
             # Converter mensagens para formato Gemini
             chat_history = []
-            system_instruction = ""
+            system_parts = []
             
             for msg in messages[:-1]:  # Todas exceto a última
                 if msg.role == "system":
-                    system_instruction = msg.content
+                    system_parts.append(msg.content)
                 elif msg.role == "user":
                     chat_history.append({"role": "user", "parts": [msg.content]})
                 elif msg.role == "assistant":
                     chat_history.append({"role": "model", "parts": [msg.content]})
             
+            system_instruction = "\n\n".join(system_parts)
+            
             # Última mensagem (atual)
             last_message = messages[-1]
             
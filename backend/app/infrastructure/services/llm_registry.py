@@ -1,6 +1,8 @@
-from typing import Dict, List, Optional, Type
+from typing import Dict, List, Optional, Type, Union
+import asyncio
 import logging
 from datetime import datetime
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from app.application.interfaces.llm_service import ILLMService, LLMResponse, LLMMessage
@@ -24,8 +26,15 @@ class LLMRegistry:
             "google": GoogleService,
         }
         
-        # Cache de instâncias de serviços
+        # Cache de instâncias de serviços (cada SDK mantém seu próprio pool HTTP)
         self.service_cache: Dict[str, ILLMService] = {}
+        
+        # Limite de requisições simultâneas por provedor (rate limit)
+        self.provider_semaphores: Dict[str, asyncio.Semaphore] = {
+            "openai": asyncio.Semaphore(20),
+            "anthropic": asyncio.Semaphore(10),
+            "google": asyncio.Semaphore(10),
+        }
     
     def _get_service_instance(self, provider: str, api_key: str) -> ILLMService:
         """Obtém ou cria uma instância do serviço"""
@@ -40,13 +49,49 @@ class LLMRegistry:
         
         return self.service_cache[cache_key]
     
+    def _get_user_keys(self, user_id: int, preferred_provider: str, db: Session):
+        """Retorna as chaves ativas do usuário separadas em (preferidas, demais)"""
+        user_repo = UserRepository(db)
+        user = user_repo.get_by_id(user_id)
+        
+        if not user:
+            raise ValueError("User not found")
+        
+        # Obter chaves do usuário ordenadas por prioridade
+        user_api_keys = sorted(
+            [key for key in user.api_keys if key.status == APIKeyStatus.ACTIVE],
+            key=lambda x: x.priority
+        )
+        
+        # Filtrar chaves do provedor preferido primeiro
+        preferred_keys = [key for key in user_api_keys if key.provider.value == preferred_provider]
+        other_keys = [key for key in user_api_keys if key.provider.value != preferred_provider]
+        
+        return preferred_keys, other_keys
+    
+    async def _load_user_keys(self, user_id: int, preferred_provider: str, db: Union[Session, AsyncSession]):
+        """Carrega as chaves do usuário a partir de sessão síncrona ou assíncrona"""
+        if isinstance(db, AsyncSession):
+            return await db.run_sync(
+                lambda session: self._get_user_keys(user_id, preferred_provider, session)
+            )
+        return self._get_user_keys(user_id, preferred_provider, db)
+    
+    @staticmethod
+    async def _commit(db: Union[Session, AsyncSession]) -> None:
+        """Confirma a transação independente do tipo de sessão"""
+        if isinstance(db, AsyncSession):
+            await db.commit()
+        else:
+            db.commit()
+    
     async def chat_completion(
         self,
         user_id: int,
         messages: List[LLMMessage],
         preferred_provider: str,
         preferred_model: str,
-        db: Session,
+        db: Union[Session, AsyncSession],
         temperature: float = 0.7,
         max_tokens: int = 2000,
         **kwargs
@@ -58,22 +103,26 @@ class LLMRegistry:
         2. Se falhar, tenta outros provedores por ordem de prioridade
         3. Atualiza status das chaves conforme necessário
         """
-        user_repo = UserRepository(db)
-        user = user_repo.get_by_id(user_id)
-        
-        if not user:
-            raise ValueError("User not found")
+        preferred_keys, other_keys = await self._load_user_keys(user_id, preferred_provider, db)
         
-        # Obter chaves do usuário ordenadas por prioridade
-        user_api_keys = sorted(
-            [key for key in user.api_keys if key.status == APIKeyStatus.ACTIVE],
-            key=lambda x: x.priority
+        return await self._complete_with_keys(
+            preferred_keys, other_keys, messages, preferred_provider, preferred_model,
+            db, temperature, max_tokens, **kwargs
         )
-        
-        # Filtrar chaves do provedor preferido primeiro
-        preferred_keys = [key for key in user_api_keys if key.provider.value == preferred_provider]
-        other_keys = [key for key in user_api_keys if key.provider.value != preferred_provider]
-        
+    
+    async def _complete_with_keys(
+        self,
+        preferred_keys: list,
+        other_keys: list,
+        messages: List[LLMMessage],
+        preferred_provider: str,
+        preferred_model: str,
+        db: Union[Session, AsyncSession],
+        temperature: float,
+        max_tokens: int,
+        **kwargs
+    ) -> LLMResponse:
+        """Tenta as chaves preferidas e depois as demais até obter uma resposta"""
         # Tentar chaves do provedor preferido primeiro
         for api_key_record in preferred_keys:
             try:
@@ -84,17 +133,18 @@ class LLMRegistry:
                 available_models = service.get_available_models()
                 model_to_use = preferred_model if preferred_model in available_models else available_models[0]
                 
-                response = await service.chat_completion(
-                    messages=messages,
-                    model=model_to_use,
-                    temperature=temperature,
-                    max_tokens=max_tokens,
-                    **kwargs
-                )
+                async with self.provider_semaphores[preferred_provider]:
+                    response = await service.chat_completion(
+                        messages=messages,
+                        model=model_to_use,
+                        temperature=temperature,
+                        max_tokens=max_tokens,
+                        **kwargs
+                    )
                 
                 # Atualizar última utilização
                 api_key_record.last_used = datetime.utcnow()
-                db.commit()
+                await self._commit(db)
                 
                 logger.info(f"Successfully used {preferred_provider} with model {model_to_use}")
                 return response
@@ -105,7 +155,7 @@ class LLMRegistry:
                 # Se erro de quota, marcar chave como esgotada
                 if "quota" in str(e).lower() or "limit" in str(e).lower():
                     api_key_record.status = APIKeyStatus.QUOTA_EXCEEDED
-                    db.commit()
+                    await self._commit(db)
                     logger.info(f"Marked key {api_key_record.id} as quota exceeded")
                 
                 continue
@@ -123,17 +173,18 @@ class LLMRegistry:
                 available_models = service.get_available_models()
                 model_to_use = available_models[0]
                 
-                response = await service.chat_completion(
-                    messages=messages,
-                    model=model_to_use,
-                    temperature=temperature,
-                    max_tokens=max_tokens,
-                    **kwargs
-                )
+                async with self.provider_semaphores[provider]:
+                    response = await service.chat_completion(
+                        messages=messages,
+                        model=model_to_use,
+                        temperature=temperature,
+                        max_tokens=max_tokens,
+                        **kwargs
+                    )
                 
                 # Atualizar última utilização
                 api_key_record.last_used = datetime.utcnow()
-                db.commit()
+                await self._commit(db)
                 
                 logger.info(f"Fallback successful: used {provider} with model {model_to_use}")
                 return response
@@ -144,7 +195,7 @@ class LLMRegistry:
                 # Se erro de quota, marcar chave como esgotada
                 if "quota" in str(e).lower() or "limit" in str(e).lower():
                     api_key_record.status = APIKeyStatus.QUOTA_EXCEEDED
-                    db.commit()
+                    await self._commit(db)
                 
                 continue
         
@@ -1,6 +1,8 @@
+import hmac
 import httpx
 import json
 import logging
+import orjson
 from typing import Dict, List, Optional, Any
 from datetime import datetime
 
@@ -12,6 +14,9 @@ from app.core.config import settings
 
 logger = logging.getLogger(__name__)
 
+# Template pré-serializado para o caso mais comum (mensagem de texto)
+_TEXT_TMPL = b'{"messaging_product":"whatsapp","to":%b,"type":"text","text":{"body":%b}}'
+
 class MetaWhatsAppService(IWhatsAppService):
     """Implementação do serviço WhatsApp usando Meta Cloud API"""
     
@@ -25,6 +30,30 @@ class MetaWhatsAppService(IWhatsAppService):
             "Authorization": f"Bearer {self.access_token}",
             "Content-Type": "application/json"
         }
+        
+        # Cliente HTTP compartilhado (keep-alive), criado no primeiro uso
+        self._client: Optional[httpx.AsyncClient] = None
+    
+    def _get_client(self) -> httpx.AsyncClient:
+        """Retorna o cliente HTTP compartilhado, reaproveitando conexões TLS"""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers=self.headers,
+                timeout=30.0,
+                limits=httpx.Limits(
+                    max_connections=100,
+                    max_keepalive_connections=20,
+                    keepalive_expiry=60.0
+                )
+            )
+        return self._client
+    
+    async def close(self) -> None:
+        """Fecha o cliente HTTP compartilhado"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
     
     async def send_message(
         self,
@@ -40,12 +69,8 @@ class MetaWhatsAppService(IWhatsAppService):
             
             # Preparar payload baseado no tipo de mensagem
             if message_type == MessageType.TEXT:
-                payload = {
-                    "messaging_product": "whatsapp",
-                    "to": clean_number,
-                    "type": "text",
-                    "text": {"body": message}
-                }
+                # Texto usa o template pronto, evitando montar e serializar o dict
+                body = _TEXT_TMPL % (orjson.dumps(clean_number), orjson.dumps(message))
             elif message_type == MessageType.IMAGE and media_url:
                 payload = {
                     "messaging_product": "whatsapp",
@@ -69,14 +94,11 @@ class MetaWhatsAppService(IWhatsAppService):
             else:
                 raise ValueError(f"Unsupported message type: {message_type}")
             
+            if message_type != MessageType.TEXT:
+                body = orjson.dumps(payload)
+            
             # Fazer requisição para API
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f"{self.base_url}/messages",
-                    headers=self.headers,
-                    json=payload,
-                    timeout=30.0
-                )
+            response = await self._get_client().post("/messages", content=body)
             
             if response.status_code == 200:
                 result = response.json()
@@ -133,13 +155,7 @@ class MetaWhatsAppService(IWhatsAppService):
                 }
             }
             
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f"{self.base_url}/messages",
-                    headers=self.headers,
-                    json=payload,
-                    timeout=30.0
-                )
+            response = await self._get_client().post("/messages", json=payload)
             
             if response.status_code == 200:
                 result = response.json()
@@ -168,12 +184,7 @@ class MetaWhatsAppService(IWhatsAppService):
     async def get_media_url(self, media_id: str) -> Optional[str]:
         """Obtém URL de mídia do WhatsApp"""
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    f"https://graph.facebook.com/v18.0/{media_id}",
-                    headers=self.headers,
-                    timeout=30.0
-                )
+            response = await self._get_client().get(f"https://graph.facebook.com/v18.0/{media_id}")
             
             if response.status_code == 200:
                 result = response.json()
@@ -195,13 +206,7 @@ class MetaWhatsAppService(IWhatsAppService):
                 "message_id": message_id
             }
             
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f"{self.base_url}/messages",
-                    headers=self.headers,
-                    json=payload,
-                    timeout=30.0
-                )
+            response = await self._get_client().post("/messages", json=payload)
             
             return response.status_code == 200
             
@@ -329,7 +334,8 @@ class MetaWhatsAppService(IWhatsAppService):
     
     async def validate_webhook(self, verify_token: str, challenge: str) -> Optional[str]:
         """Valida webhook do WhatsApp"""
-        if verify_token == self.verify_token:
+        # Comparação em tempo constante para não vazar o token por timing
+        if self.verify_token and hmac.compare_digest(verify_token.encode(), self.verify_token.encode()):
             logger.info("Webhook validated successfully")
             return challenge
         else:
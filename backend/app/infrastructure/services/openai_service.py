@@ -1,11 +1,21 @@
 import openai
-from typing import List, Dict, Any
+from typing import List, Dict, Any, AsyncIterator, Callable, Optional
 import logging
 
 from app.application.interfaces.llm_service import ILLMService, LLMResponse, LLMMessage
 
 logger = logging.getLogger(__name__)
 
+
+def _usage_value(usage: Any, field: str) -> int:
+    """Lê um contador de uso do stream, que pode chegar como objeto ou dict (campo extra)"""
+    if usage is None:
+        return 0
+    if isinstance(usage, dict):
+        return usage.get(field) or 0
+    return getattr(usage, field, None) or 0
+
+
 class OpenAIService(ILLMService):
     """Implementação do serviço OpenAI"""
     
@@ -38,6 +48,11 @@ class OpenAIService(ILLMService):
                 for msg in messages
             ]
             
+            # Chave de roteamento do cache de prompt do provedor
+            prompt_cache_key = kwargs.pop("prompt_cache_key", None)
+            if prompt_cache_key:
+                kwargs["extra_body"] = {"prompt_cache_key": prompt_cache_key}
+            
             # Fazer requisição
             response = await self.client.chat.completions.create(
                 model=model,
@@ -74,6 +89,83 @@ class OpenAIService(ILLMService):
             logger.error(f"OpenAI API error: {e}")
             raise Exception(f"OpenAI API error: {str(e)}")
     
+    async def chat_completion_stream(
+        self,
+        messages: List[LLMMessage],
+        model: str,
+        temperature: float = 0.7,
+        max_tokens: int = 2000,
+        on_complete: Optional[Callable[[LLMResponse], None]] = None,
+        **kwargs
+    ) -> AsyncIterator[str]:
+        """Gera uma resposta de chat em streaming, retornando os tokens conforme chegam"""
+        openai_messages = [
+            {"role": msg.role, "content": msg.content}
+            for msg in messages
+        ]
+        
+        parts: List[str] = []
+        finish_reason = None
+        usage = None
+        response_id = None
+        
+        # O SDK fixado (<1.10) não conhece stream_options nem prompt_cache_key;
+        # ambos seguem no corpo da requisição via extra_body
+        extra_body = dict(kwargs.pop("extra_body", None) or {})
+        extra_body["stream_options"] = {"include_usage": True}
+        prompt_cache_key = kwargs.pop("prompt_cache_key", None)
+        if prompt_cache_key:
+            extra_body["prompt_cache_key"] = prompt_cache_key
+        
+        try:
+            stream = await self.client.chat.completions.create(
+                model=model,
+                messages=openai_messages,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                stream=True,
+                extra_body=extra_body,
+                **kwargs
+            )
+            
+            async for chunk in stream:
+                response_id = chunk.id
+                # O último chunk traz apenas o uso de tokens, sem choices;
+                # versões antigas do SDK não expõem o atributo usage
+                chunk_usage = getattr(chunk, "usage", None)
+                if chunk_usage is not None:
+                    usage = chunk_usage
+                if not chunk.choices:
+                    continue
+                
+                choice = chunk.choices[0]
+                if choice.finish_reason:
+                    finish_reason = choice.finish_reason
+                delta = choice.delta.content
+                if delta:
+                    parts.append(delta)
+                    yield delta
+                    
+        except Exception as e:
+            logger.error(f"OpenAI streaming error: {e}")
+            raise Exception(f"OpenAI API error: {str(e)}")
+        
+        if on_complete is not None:
+            tokens_used = _usage_value(usage, "total_tokens")
+            on_complete(LLMResponse(
+                content="".join(parts),
+                tokens_used=tokens_used,
+                cost=self.estimate_cost(tokens_used, model),
+                model=model,
+                provider="openai",
+                finish_reason=finish_reason,
+                metadata={
+                    "prompt_tokens": _usage_value(usage, "prompt_tokens"),
+                    "completion_tokens": _usage_value(usage, "completion_tokens"),
+                    "response_id": response_id
+                }
+            ))
+    
     async def validate_api_key(self, api_key: str) -> bool:
         """Valida uma chave de API OpenAI"""
         try:
@@ -1,13 +1,17 @@
 import asyncio
+import hashlib
 import logging
-from typing import Optional, List, Dict, Any
+import re
+from typing import Optional, List, Dict, Any, Tuple
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from datetime import datetime
 
 from app.application.interfaces.whatsapp_service import WhatsAppMessage, MessageType
-from app.application.interfaces.llm_service import LLMMessage
+from app.application.interfaces.llm_service import LLMMessage, LLMResponse
 from app.infrastructure.services.meta_whatsapp_service import meta_whatsapp_service
 from app.infrastructure.services.llm_registry import llm_registry
+from app.infrastructure.cache.cache_manager import cache_manager, ConversationCache, AgentLoadCache
 from app.infrastructure.repositories.conversation_repository import ConversationRepository
 from app.infrastructure.repositories.agent_repository import AgentRepository
 from app.infrastructure.repositories.user_repository import UserRepository
@@ -16,33 +20,86 @@ from app.domain.models.agent import AgentCategory, AgentStatus
 
 logger = logging.getLogger(__name__)
 
+# Janela de deduplicação de mensagens recebidas (segundos)
+MESSAGE_DEDUP_TTL = 300
+
+# Espera antes de reenviar uma resposta que falhou na Meta API (segundos)
+SEND_RETRY_DELAY = 30
+
+# Cache de respostas para perguntas frequentes (segundos)
+FAQ_CACHE_TTL = 3600
+FAQ_MAX_ANSWER_LENGTH = 400
+
+# Construtores do OpenSSL ligados uma única vez (hashes não criptográficos)
+_md5 = hashlib.md5
+_blake2b = hashlib.blake2b
+
+_WHITESPACE_RE = re.compile(r"\s+")
+_DIGIT_RE = re.compile(r"\d")
+
+DEFAULT_INSTRUCTIONS = "Foque em resolver a dúvida do cliente de forma eficiente."
+
+# Diretrizes fixas do canal WhatsApp (parte estável do prompt)
+WHATSAPP_GUIDELINES = """
+
+CONTEXTO DO CANAL:
+- Você está atendendo via WhatsApp
+- Canal: WhatsApp Business
+
+DIRETRIZES ESPECÍFICAS:
+1. Seja cordial, profissional e empático
+2. Responda de forma concisa (máximo 2-3 parágrafos)
+3. Use emojis moderadamente quando apropriado
+4. Se não souber algo, seja honesto e ofereça alternativas
+5. Sempre pergunte se pode ajudar em mais alguma coisa
+6. Se o problema for complexo, sugira escalação para humano
+"""
+
 class WhatsAppAIService:
     """Serviço que integra WhatsApp com agentes de IA"""
     
     def __init__(self):
-        self.processing_messages = set()  # Para evitar processamento duplicado
+        # Dedup local, usado apenas quando o Redis não está disponível
+        self.processing_messages = set()
+        
+        # Limite de envios simultâneos para a Meta Cloud API (~80 msg/s)
+        self.meta_sem = asyncio.Semaphore(15)
+        
+        # Reenvios agendados (referência mantida para não serem coletados)
+        self._retry_tasks: set = set()
+        
+        # Prefixo estático do prompt por agente: agent_id -> (updated_at, prompt)
+        self._prompt_cache: Dict[int, Tuple[Any, str]] = {}
     
     async def process_incoming_message(
         self,
         whatsapp_message: WhatsAppMessage,
         user_id: int,
-        db: Session
+        db: AsyncSession
     ) -> Optional[WhatsAppMessage]:
         """Processa mensagem recebida e gera resposta com IA"""
         
-        # Evitar processamento duplicado
-        if whatsapp_message.id in self.processing_messages:
+        # Evitar processamento duplicado entre workers (retries do webhook da Meta).
+        # A chave expira sozinha; não é removida no final para não reabrir a janela.
+        acquired = await cache_manager.set_if_absent(
+            f"wa:msg:{whatsapp_message.id}", "1", ttl=MESSAGE_DEDUP_TTL
+        )
+        
+        if acquired is None:
+            # Redis indisponível: dedup apenas neste processo
+            acquired = whatsapp_message.id not in self.processing_messages
+            if acquired:
+                self.processing_messages.add(whatsapp_message.id)
+        
+        if not acquired:
             logger.info(f"Message {whatsapp_message.id} already being processed")
             return None
         
-        self.processing_messages.add(whatsapp_message.id)
-        
         try:
             conversation_repo = ConversationRepository(db)
-            agent_repo = AgentRepository(db)
             
             # Buscar ou criar conversa
-            conversation = conversation_repo.get_conversation_by_phone(
+            conversation = await conversation_repo.get_conversation_by_phone(
                 user_id=user_id,
                 phone_number=whatsapp_message.from_number
             )
@@ -59,11 +116,11 @@ class WhatsAppAIService:
                     "is_ai_handled": True,
                     "metadata": whatsapp_message.metadata or {}
                 }
-                conversation = conversation_repo.create_conversation(conversation_data)
+                conversation = await conversation_repo.create_conversation(conversation_data)
                 logger.info(f"Created new conversation {conversation.id} for {whatsapp_message.from_number}")
             
             # Adicionar mensagem do cliente
-            customer_message = conversation_repo.add_message({
+            customer_message = await conversation_repo.add_message({
                 "conversation_id": conversation.id,
                 "content": whatsapp_message.content,
                 "role": MessageRole.CUSTOMER,
@@ -71,6 +128,7 @@ class WhatsAppAIService:
                 "external_id": whatsapp_message.id,
                 "metadata": whatsapp_message.metadata or {}
             })
+            await ConversationCache.push_message(conversation.id, "user", customer_message.content)
             
             # Verificar se conversa requer intervenção humana
             if conversation.requires_human or conversation.status == ConversationStatus.ESCALATED:
@@ -78,49 +136,47 @@ class WhatsAppAIService:
                 return None
             
             # Buscar agente de atendimento adequado
-            agent = await self._find_suitable_agent(user_id, conversation, agent_repo)
+            agent = await self._find_suitable_agent(user_id, conversation.agent_id, db)
             
             if not agent:
                 logger.warning(f"No suitable agent found for user {user_id}")
                 # Marcar como pendente para intervenção humana
-                conversation_repo.update_conversation(conversation.id, {
+                await conversation_repo.update_conversation(conversation.id, {
                     "status": ConversationStatus.PENDING,
                     "requires_human": True
                 })
                 return None
             
-            # Atribuir agente à conversa se não estiver atribuído
-            if not conversation.agent_id:
-                conversation_repo.assign_agent(conversation.id, agent.id)
-                conversation.agent_id = agent.id
-            
             # Gerar resposta com IA
-            ai_response = await self._generate_ai_response(
+            llm_response = await self._generate_ai_response(
                 conversation=conversation,
                 customer_message=customer_message.content,
+                customer_message_id=customer_message.id,
                 agent=agent,
                 user_id=user_id,
                 db=db
             )
             
-            if ai_response:
-                # Salvar resposta da IA no banco
-                conversation_repo.add_message({
-                    "conversation_id": conversation.id,
-                    "content": ai_response,
-                    "role": MessageRole.AGENT,
-                    "message_type": "text"
-                })
+            if llm_response:
+                ai_response = llm_response.content
                 
-                # Enviar resposta via WhatsApp
-                response_message = await meta_whatsapp_service.send_message(
-                    to_number=whatsapp_message.from_number,
-                    message=ai_response,
-                    message_type=MessageType.TEXT
+                # Gravação no banco e envio para a Meta são independentes: rodam em paralelo
+                db_result, send_result = await asyncio.gather(
+                    self._save_ai_response(conversation_repo, conversation, agent, llm_response, db),
+                    self._send_reply(whatsapp_message.from_number, ai_response),
+                    return_exceptions=True
                 )
                 
+                if isinstance(db_result, Exception):
+                    logger.error(f"Error saving AI response for conversation {conversation.id}: {db_result}")
+                
+                if isinstance(send_result, Exception):
+                    logger.error(f"Error sending AI response to {whatsapp_message.from_number}: {send_result}")
+                    self._schedule_send_retry(whatsapp_message.from_number, ai_response)
+                    return None
+                
                 logger.info(f"AI response sent to {whatsapp_message.from_number}")
-                return response_message
+                return send_result
             
             return None
             
@@ -129,19 +185,69 @@ class WhatsAppAIService:
             return None
         
         finally:
-            # Remover da lista de processamento
+            # Remover da lista local de processamento
             self.processing_messages.discard(whatsapp_message.id)
     
-    async def _find_suitable_agent(
+    async def _save_ai_response(
         self,
-        user_id: int,
+        conversation_repo: ConversationRepository,
         conversation,
-        agent_repo: AgentRepository
-    ) -> Optional:
-        """Encontra o agente mais adequado para a conversa"""
+        agent,
+        llm_response: LLMResponse,
+        db: AsyncSession
+    ) -> None:
+        """Grava resposta, atribuição do agente e métricas em uma única transação"""
+        await conversation_repo.add_message({
+            "conversation_id": conversation.id,
+            "content": llm_response.content,
+            "role": MessageRole.AGENT,
+            "message_type": "text"
+        }, commit=False)
+        
+        if not conversation.agent_id:
+            await conversation_repo.assign_agent(conversation.id, agent.id, commit=False)
+            conversation.agent_id = agent.id
+        
+        await db.run_sync(
+            lambda session: AgentRepository(session).update_metrics(
+                agent_id=agent.id,
+                task_completed=True,
+                tokens_used=llm_response.tokens_used,
+                cost=llm_response.cost,
+                commit=False
+            )
+        )
+        await db.commit()
+        await ConversationCache.push_message(conversation.id, "assistant", llm_response.content)
+        await AgentLoadCache.increment(agent.user_id, agent.id)
+    
+    async def _send_reply(self, to_number: str, message: str) -> WhatsAppMessage:
+        """Envia a resposta via WhatsApp respeitando o limite da Meta API"""
+        async with self.meta_sem:
+            return await meta_whatsapp_service.send_message(
+                to_number=to_number,
+                message=message,
+                message_type=MessageType.TEXT
+            )
+    
+    def _schedule_send_retry(self, to_number: str, message: str) -> None:
+        """Agenda um novo envio da resposta já gravada no banco"""
+        async def retry():
+            await asyncio.sleep(SEND_RETRY_DELAY)
+            try:
+                await self._send_reply(to_number, message)
+                logger.info(f"AI response re-sent to {to_number}")
+            except Exception as e:
+                logger.error(f"Retry failed sending AI response to {to_number}: {e}")
         
+        task = asyncio.create_task(retry())
+        self._retry_tasks.add(task)
+        task.add_done_callback(self._retry_tasks.discard)
+    
+    def _load_agent_candidates(self, session: Session, user_id: int) -> List:
+        """Agentes elegíveis para atendimento (executado via run_sync)"""
         # Buscar agentes de atendimento disponíveis
-        available_agents = agent_repo.get_available_agents(user_id)
+        available_agents = AgentRepository(session).get_available_agents(user_id)
         
         # Filtrar por categoria de suporte/atendimento
         support_agents = [
@@ -149,54 +255,112 @@ class WhatsAppAIService:
             if agent.category in [AgentCategory.SUPPORT, AgentCategory.GENERAL]
         ]
         
-        if not support_agents:
-            # Se não há agentes de suporte, usar qualquer agente disponível
-            support_agents = available_agents
-        
-        if not support_agents:
-            return None
-        
+        # Se não há agentes de suporte, usar qualquer agente disponível
+        return support_agents or available_agents
+    
+    async def _find_suitable_agent(
+        self,
+        user_id: int,
+        current_agent_id: Optional[int],
+        db: AsyncSession
+    ) -> Optional:
+        """Encontra o agente mais adequado para a conversa"""
         # Se a conversa já tem um agente atribuído, verificar se ainda está disponível
-        if conversation.agent_id:
-            current_agent = agent_repo.get_by_id(conversation.agent_id)
+        if current_agent_id:
+            current_agent = await db.run_sync(
+                lambda session: AgentRepository(session).get_by_id(current_agent_id)
+            )
             if current_agent and current_agent.is_available:
                 return current_agent
         
-        # Escolher agente com menor carga de trabalho (menos tarefas ativas)
-        best_agent = min(support_agents, key=lambda a: a.tasks_completed + a.tasks_failed)
+        # Ranking por carga no Redis: só os primeiros colocados são carregados do banco
+        ranked_ids = await AgentLoadCache.get_least_loaded(user_id)
+        if ranked_ids:
+            agents = await db.run_sync(
+                lambda session: AgentRepository(session).get_by_ids(ranked_ids)
+            )
+            agents_by_id = {agent.id: agent for agent in agents}
+            for agent_id in ranked_ids:
+                agent = agents_by_id.get(agent_id)
+                if agent and agent.is_available:
+                    return agent
+        
+        # Sem ranking (ou ranking desatualizado): consultar o banco e reconstruí-lo
+        candidates = await db.run_sync(self._load_agent_candidates, user_id)
+        if not candidates:
+            return None
         
-        return best_agent
+        await AgentLoadCache.set_loads(
+            user_id, {agent.id: agent.tasks_completed + agent.tasks_failed for agent in candidates}
+        )
+        
+        # Escolher agente com menor carga de trabalho (menos tarefas ativas)
+        return min(candidates, key=lambda a: a.tasks_completed + a.tasks_failed)
     
     async def _generate_ai_response(
         self,
         conversation,
         customer_message: str,
+        customer_message_id: int,
         agent,
         user_id: int,
-        db: Session
-    ) -> Optional[str]:
+        db: AsyncSession
+    ) -> Optional[LLMResponse]:
         """Gera resposta usando agente de IA"""
         
         try:
-            conversation_repo = ConversationRepository(db)
+            agent_version = _md5(f"{agent.id}:{agent.updated_at}".encode(), usedforsecurity=False).hexdigest()[:8]
+            
+            # Obter histórico anterior à mensagem atual, em ordem cronológica
+            # (Redis primeiro, banco se não houver)
+            history = await ConversationCache.get_recent_messages(conversation.id, exclude_latest=True)
+            
+            if history is None:
+                conversation_repo = ConversationRepository(db)
+                history = [
+                    {
+                        "role": "user" if msg.role == MessageRole.CUSTOMER else "assistant",
+                        "content": msg.content
+                    }
+                    for msg in await conversation_repo.get_history_before(
+                        conversation.id, customer_message_id, limit=ConversationCache.HISTORY_SIZE - 1
+                    )
+                ]
+                await ConversationCache.set_recent_messages(
+                    conversation.id, history + [{"role": "user", "content": customer_message}]
+                )
             
-            # Obter histórico de mensagens recentes
-            recent_messages = conversation_repo.get_recent_messages(
-                conversation.id, 
-                limit=10
-            )
+            # Perguntas frequentes repetidas são respondidas direto do cache, mas
+            # só na abertura da conversa: no meio dela ("sim", "e o preço?") a
+            # resposta depende do histórico daquele cliente
+            faq_key = None
+            if not history:
+                faq_key = self._faq_cache_key(agent.id, agent_version, customer_message)
+                cached_answer = await cache_manager.get(faq_key)
+                if cached_answer is not None:
+                    logger.info(f"FAQ cache hit for agent {agent.id}")
+                    return LLMResponse(
+                        content=cached_answer,
+                        tokens_used=0,
+                        cost=0.0,
+                        model=agent.llm_model,
+                        provider="cache",
+                        finish_reason="cache_hit",
+                        metadata={"cache_key": faq_key}
+                    )
             
             # Construir contexto da conversa
             context_messages = []
             
-            # System prompt do agente
-            system_prompt = self._build_system_prompt(agent, conversation)
-            context_messages.append(LLMMessage(role="system", content=system_prompt))
+            # System prompt do agente: prefixo estável primeiro (cacheável pelo
+            # provedor) e os dados da conversa em uma mensagem separada
+            static_prefix, dynamic_suffix = self._build_system_prompt(agent, conversation)
+            context_messages.append(LLMMessage(role="system", content=static_prefix))
+            context_messages.append(LLMMessage(role="system", content=dynamic_suffix))
             
             # Adicionar histórico de mensagens
-            for msg in reversed(recent_messages[:-1]):  # Excluir a última (atual)
-                role = "user" if msg.role == MessageRole.CUSTOMER else "assistant"
-                context_messages.append(LLMMessage(role=role, content=msg.content))
+            for msg in history:
+                context_messages.append(LLMMessage(role=msg["role"], content=msg["content"]))
             
             # Adicionar mensagem atual do cliente
             context_messages.append(LLMMessage(role="user", content=customer_message))
@@ -209,71 +373,82 @@ class WhatsAppAIService:
                 preferred_model=agent.llm_model,
                 db=db,
                 temperature=agent.settings.get("temperature", 0.7) if agent.settings else 0.7,
-                max_tokens=agent.settings.get("max_tokens", 1000) if agent.settings else 1000
+                max_tokens=agent.settings.get("max_tokens", 1000) if agent.settings else 1000,
+                prompt_cache_key=agent_version
             )
             
-            # Atualizar métricas do agente
-            agent_repo = AgentRepository(db)
-            agent_repo.update_metrics(
-                agent_id=agent.id,
-                task_completed=True,
-                tokens_used=response.tokens_used,
-                cost=response.cost
-            )
+            if faq_key is not None and self._is_cacheable_answer(response.content, conversation):
+                await cache_manager.set(faq_key, response.content, ttl=FAQ_CACHE_TTL)
             
-            return response.content
+            # Métricas de sucesso são gravadas pelo chamador junto com a resposta
+            return response
             
         except Exception as e:
             logger.error(f"Error generating AI response: {e}")
             
             # Atualizar métricas de falha
             try:
-                agent_repo = AgentRepository(db)
-                agent_repo.update_metrics(
-                    agent_id=agent.id,
-                    task_completed=False,
-                    tokens_used=0,
-                    cost=0.0
+                await db.run_sync(
+                    lambda session: AgentRepository(session).update_metrics(
+                        agent_id=agent.id,
+                        task_completed=False,
+                        tokens_used=0,
+                        cost=0.0
+                    )
                 )
+                await AgentLoadCache.increment(agent.user_id, agent.id)
             except:
                 pass
             
             return None
     
-    def _build_system_prompt(self, agent, conversation) -> str:
-        """Constrói prompt do sistema para o agente"""
+    @staticmethod
+    def _faq_cache_key(agent_id: int, agent_version: str, customer_message: str) -> str:
+        """Chave do cache de respostas: agente + mensagem normalizada"""
+        normalized = _WHITESPACE_RE.sub(" ", customer_message.strip().lower())
+        digest = _blake2b(normalized.encode(), digest_size=16).hexdigest()
+        return f"wa:ans:{agent_id}:{agent_version}:{digest}"
+    
+    @staticmethod
+    def _is_cacheable_answer(content: Optional[str], conversation) -> bool:
+        """Só reaproveita respostas curtas e genéricas (sem dados do cliente ou números)"""
+        if not content or len(content) >= FAQ_MAX_ANSWER_LENGTH:
+            return False
+        if _DIGIT_RE.search(content):
+            return False
+        if conversation.customer_name and conversation.customer_name.lower() in content.lower():
+            return False
+        return True
+    
+    def _build_system_prompt(self, agent, conversation) -> Tuple[str, str]:
+        """Constrói o prompt do sistema como (prefixo estático, sufixo dinâmico)"""
         
-        base_prompt = agent.system_prompt
+        # Prefixo idêntico para todas as conversas do agente, montado uma vez
+        # por versão do agente (updated_at muda quando o agente é editado)
+        cached = self._prompt_cache.get(agent.id)
+        if cached is not None and cached[0] == agent.updated_at:
+            static_prefix = cached[1]
+        else:
+            static_prefix = agent.system_prompt + WHATSAPP_GUIDELINES
+            self._prompt_cache[agent.id] = (agent.updated_at, static_prefix)
         
-        # Adicionar contexto específico do WhatsApp
-        whatsapp_context = f"""
-
-CONTEXTO DO ATENDIMENTO:
-- Você está atendendo via WhatsApp
-- Cliente: {conversation.customer_name or 'Cliente'}
-- Telefone: {conversation.customer_phone}
-- Canal: WhatsApp Business
-
-DIRETRIZES ESPECÍFICAS:
-1. Seja cordial, profissional e empático
-2. Responda de forma concisa (máximo 2-3 parágrafos)
-3. Use emojis moderadamente quando apropriado
-4. Se não souber algo, seja honesto e ofereça alternativas
-5. Sempre pergunte se pode ajudar em mais alguma coisa
-6. Se o problema for complexo, sugira escalação para humano
-
-INSTRUÇÕES ADICIONAIS:
-{agent.instructions or "Foque em resolver a dúvida do cliente de forma eficiente."}
-"""
+        # Contexto específico da conversa
+        dynamic_suffix = (
+            f"CONTEXTO DO ATENDIMENTO:\n"
+            f"- Cliente: {conversation.customer_name or 'Cliente'}\n"
+            f"- Telefone: {conversation.customer_phone}\n\n"
+            f"INSTRUÇÕES ADICIONAIS:\n"
+            f"{agent.instructions or DEFAULT_INSTRUCTIONS}\n"
+        )
         
-        return base_prompt + whatsapp_context
+        return static_prefix, dynamic_suffix
     
     async def send_proactive_message(
         self,
         user_id: int,
         phone_number: str,
         message: str,
-        db: Session
+        db: AsyncSession
     ) -> Optional[WhatsAppMessage]:
         """Envia mensagem proativa para um cliente"""
         
@@ -281,7 +456,7 @@ INSTRUÇÕES ADICIONAIS:
             conversation_repo = ConversationRepository(db)
             
             # Buscar conversa existente
-            conversation = conversation_repo.get_conversation_by_phone(user_id, phone_number)
+            conversation = await conversation_repo.get_conversation_by_phone(user_id, phone_number)
             
             if not conversation:
                 # Criar nova conversa
@@ -293,23 +468,25 @@ INSTRUÇÕES ADICIONAIS:
                     "user_id": user_id,
                     "is_ai_handled": True
                 }
-                conversation = conversation_repo.create_conversation(conversation_data)
+                conversation = await conversation_repo.create_conversation(conversation_data)
             
             # Enviar mensagem
-            whatsapp_response = await meta_whatsapp_service.send_message(
-                to_number=phone_number,
-                message=message,
-                message_type=MessageType.TEXT
-            )
+            async with self.meta_sem:
+                whatsapp_response = await meta_whatsapp_service.send_message(
+                    to_number=phone_number,
+                    message=message,
+                    message_type=MessageType.TEXT
+                )
             
             # Salvar no banco
-            conversation_repo.add_message({
+            await conversation_repo.add_message({
                 "conversation_id": conversation.id,
                 "content": message,
                 "role": MessageRole.AGENT,
                 "message_type": "text",
                 "external_id": whatsapp_response.id
             })
+            await ConversationCache.push_message(conversation.id, "assistant", message)
             
             logger.info(f"Proactive message sent to {phone_number}")
             return whatsapp_response
@@ -322,7 +499,7 @@ INSTRUÇÕES ADICIONAIS:
         self,
         conversation_id: int,
         reason: str,
-        db: Session
+        db: AsyncSession
     ) -> bool:
         """Escala conversa para atendimento humano"""
         
@@ -330,15 +507,17 @@ INSTRUÇÕES ADICIONAIS:
             conversation_repo = ConversationRepository(db)
             
             # Marcar como escalada
-            conversation_repo.mark_as_escalated(conversation_id)
+            await conversation_repo.mark_as_escalated(conversation_id)
             
             # Adicionar mensagem de sistema
-            conversation_repo.add_message({
+            system_note = f"Conversa escalada para atendimento humano. Motivo: {reason}"
+            await conversation_repo.add_message({
                 "conversation_id": conversation_id,
-                "content": f"Conversa escalada para atendimento humano. Motivo: {reason}",
+                "content": system_note,
                 "role": MessageRole.SYSTEM,
                 "message_type": "text"
             })
+            await ConversationCache.push_message(conversation_id, "assistant", system_note)
             
             logger.info(f"Conversation {conversation_id} escalated to human: {reason}")
             return True
@@ -1,20 +1,56 @@
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse, Response
+from contextlib import asynccontextmanager
 import time
 import logging
+import orjson
 
 from app.core.config import settings
 from app.api.v1.router import api_router
-from app.infrastructure.db.database import engine, Base
+from app.infrastructure.db.database import async_engine, Base
+from app.infrastructure.cache.cache_manager import cache_manager
+from app.infrastructure.services.meta_whatsapp_service import meta_whatsapp_service
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Criar tabelas do banco de dados
-Base.metadata.create_all(bind=engine)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Inicializa e libera os recursos compartilhados da aplicação"""
+    logger.info(f"Starting {settings.APP_NAME} v{settings.VERSION}")
+    logger.info(f"Debug mode: {settings.DEBUG}")
+    logger.info(f"Environment: {'development' if settings.DEBUG else 'production'}")
+    # Não logar URL completa do banco (pode conter credenciais)
+    db_type = 'SQLite' if 'sqlite' in settings.database_url else 'PostgreSQL'
+    logger.info(f"Database: {db_type}")
+    logger.info(f"CORS Origins: {len(settings.cors_origins)} configured")
+    
+    # Pools compartilhados ficam acessíveis via app.state
+    app.state.db_engine = async_engine
+    app.state.cache = cache_manager
+    app.state.whatsapp = meta_whatsapp_service
+    
+    # Criar tabelas do banco de dados sem bloquear o event loop
+    # (desligável quando as migrações já rodaram, ex.: initContainer/CI)
+    if not settings.SKIP_DB_CREATE:
+        async with async_engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+    # Cache Redis (opcional: sem Redis as consultas vão direto ao banco)
+    await cache_manager.initialize()
+    # Gerar o schema OpenAPI no startup (FastAPI guarda em app.openapi_schema),
+    # tirando esse custo da primeira requisição a /docs ou /openapi.json
+    app.openapi()
+    
+    yield
+    
+    # Fechar na ordem inversa de dependência: HTTP, Redis e por fim o banco
+    logger.info(f"Shutting down {settings.APP_NAME}")
+    await meta_whatsapp_service.close()
+    await cache_manager.close()
+    await async_engine.dispose()
 
 # Criar aplicação FastAPI
 app = FastAPI(
@@ -24,6 +60,8 @@ app = FastAPI(
     openapi_url=f"{settings.API_V1_STR}/openapi.json",
     docs_url="/docs",
     redoc_url="/redoc",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
 )
 
 # Middleware de CORS - Configuração segura
@@ -55,61 +93,61 @@ app.add_middleware(
 # Middleware para logging de requests
 @app.middleware("http")
 async def log_requests(request: Request, call_next):
-    start_time = time.time()
+    # Com INFO desligado (produção) não há custo de relógio nem de logging
+    if not logger.isEnabledFor(logging.INFO):
+        return await call_next(request)
     
-    # Log da requisição (sem dados sensíveis)
-    logger.info(f"Request: {request.method} {request.url.path}")
+    start_ns = time.perf_counter_ns()
     
     # Processar requisição
     response = await call_next(request)
     
-    # Log da resposta
-    process_time = time.time() - start_time
-    logger.info(f"Response: {response.status_code} - Time: {process_time:.4f}s")
+    # Uma única linha por requisição (sem dados sensíveis)
+    logger.info(
+        "Request: %s %s -> %d in %dµs",
+        request.method,
+        request.url.path,
+        response.status_code,
+        (time.perf_counter_ns() - start_ns) // 1000
+    )
     
     return response
 
 # Incluir routers da API
 app.include_router(api_router, prefix=settings.API_V1_STR)
 
+# Campos estáticos do health check (só o timestamp muda por requisição)
+_HEALTH_INFO = {
+    "status": "healthy",
+    "app_name": settings.APP_NAME,
+    "version": settings.VERSION,
+}
+
 # Endpoint de health check
 @app.get("/health")
 async def health_check():
     """Endpoint para verificar se a API está funcionando"""
-    return {
-        "status": "healthy",
-        "app_name": settings.APP_NAME,
-        "version": settings.VERSION,
-        "timestamp": time.time()
-    }
+    return ORJSONResponse({**_HEALTH_INFO, "timestamp": time.time()})
+
+# Corpo de erro de produção pré-serializado (não expõe detalhes da exceção)
+_ERROR_BODY = orjson.dumps({
+    "detail": "Internal server error",
+    "error": "An unexpected error occurred"
+})
 
 # Handler de exceções globais
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
-    logger.error(f"Global exception: {exc}")
-    return JSONResponse(
-        status_code=500,
-        content={
-            "detail": "Internal server error",
-            "error": str(exc) if settings.DEBUG else "An unexpected error occurred"
-        }
-    )
-
-# Evento de startup
-@app.on_event("startup")
-async def startup_event():
-    logger.info(f"Starting {settings.APP_NAME} v{settings.VERSION}")
-    logger.info(f"Debug mode: {settings.DEBUG}")
-    logger.info(f"Environment: {'development' if settings.DEBUG else 'production'}")
-    # Não logar URL completa do banco (pode conter credenciais)
-    db_type = 'SQLite' if 'sqlite' in settings.database_url else 'PostgreSQL'
-    logger.info(f"Database: {db_type}")
-    logger.info(f"CORS Origins: {len(settings.cors_origins)} configured")
-
-# Evento de shutdown
-@app.on_event("shutdown")
-async def shutdown_event():
-    logger.info(f"Shutting down {settings.APP_NAME}")
+    # Traceback completo no log; formatação lazy
+    logger.exception("Global exception on %s", request.url.path)
+    
+    if settings.DEBUG:
+        return ORJSONResponse(
+            status_code=500,
+            content={"detail": "Internal server error", "error": str(exc)}
+        )
+    
+    return Response(content=_ERROR_BODY, status_code=500, media_type="application/json")
 
 if __name__ == "__main__":
     import uvicorn
@@ -6,8 +6,8 @@ Mostra como criar agentes, adicionar chaves de API e executar tarefas.
 
 import asyncio
 import httpx
-import json
-from typing import Dict, Any
+import orjson
+from typing import Dict, Any, Optional
 
 # Configurações da API
 API_BASE_URL = "http://localhost:8000/api/v1"
@@ -15,7 +15,13 @@ API_BASE_URL = "http://localhost:8000/api/v1"
 class AIAgentsDemo:
     def __init__(self):
         self.access_token = None
-        self.client = httpx.AsyncClient()
+        self._auth_headers: Dict[str, str] = {}
+        # HTTP/2 multiplexa as requisições em uma única conexão (fechar com aclose())
+        self.client = httpx.AsyncClient(
+            http2=True,
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=50),
+            timeout=10.0
+        )
     
     async def register_user(self, license_key: str) -> Dict[str, Any]:
         """Registra um novo usuário"""
@@ -29,14 +35,11 @@ class AIAgentsDemo:
             "company": "AI Agents Demo"
         }
         
-        response = await self.client.post(
-            f"{API_BASE_URL}/auth/register",
-            json=user_data
-        )
+        response = await self._post_json(f"{API_BASE_URL}/auth/register", user_data)
         
         if response.status_code == 201:
             result = response.json()
-            self.access_token = result["access_token"]
+            self._set_token(result["access_token"])
             print("✅ Usuário registrado com sucesso!")
             return result
         else:
@@ -52,23 +55,38 @@ class AIAgentsDemo:
             "password": password
         }
         
-        response = await self.client.post(
-            f"{API_BASE_URL}/auth/login",
-            json=login_data
-        )
+        response = await self._post_json(f"{API_BASE_URL}/auth/login", login_data)
         
         if response.status_code == 200:
             result = response.json()
-            self.access_token = result["access_token"]
+            self._set_token(result["access_token"])
             print("✅ Login realizado com sucesso!")
             return result
         else:
             print(f"❌ Erro no login: {response.text}")
             return None
     
+    async def _post_json(
+        self,
+        url: str,
+        payload: Dict[str, Any],
+        headers: Optional[Dict[str, str]] = None
+    ) -> httpx.Response:
+        """POST com corpo serializado via orjson (evita o json.dumps interno do httpx)"""
+        return await self.client.post(
+            url,
+            content=orjson.dumps(payload),
+            headers={**(headers or {}), "Content-Type": "application/json"}
+        )
+    
+    def _set_token(self, access_token: str) -> None:
+        """Guarda o token e monta os headers de autenticação uma única vez"""
+        self.access_token = access_token
+        self._auth_headers = {"Authorization": f"Bearer {access_token}"}
+    
     def _get_headers(self) -> Dict[str, str]:
         """Retorna headers com token de autenticação"""
-        return {"Authorization": f"Bearer {self.access_token}"}
+        return self._auth_headers
     
     async def add_api_key(self, provider: str, api_key: str, name: str) -> Dict[str, Any]:
         """Adiciona uma chave de API"""
@@ -82,11 +100,7 @@ class AIAgentsDemo:
             "monthly_limit": "100.00"
         }
         
-        response = await self.client.post(
-            f"{API_BASE_URL}/api-keys/",
-            json=api_key_data,
-            headers=self._get_headers()
-        )
+        response = await self._post_json(f"{API_BASE_URL}/api-keys/", api_key_data, headers=self._get_headers())
         
         if response.status_code == 201:
             result = response.json()
@@ -100,11 +114,7 @@ class AIAgentsDemo:
         """Cria um novo agente"""
         print(f"🤖 Criando agente: {agent_data['name']}...")
         
-        response = await self.client.post(
-            f"{API_BASE_URL}/agents/",
-            json=agent_data,
-            headers=self._get_headers()
-        )
+        response = await self._post_json(f"{API_BASE_URL}/agents/", agent_data, headers=self._get_headers())
         
         if response.status_code == 201:
             result = response.json()
@@ -118,11 +128,7 @@ class AIAgentsDemo:
         """Executa uma tarefa"""
         print(f"⚡ Executando tarefa: {task_data['title']}...")
         
-        response = await self.client.post(
-            f"{API_BASE_URL}/tasks/execute",
-            json=task_data,
-            headers=self._get_headers()
-        )
+        response = await self._post_json(f"{API_BASE_URL}/tasks/execute", task_data, headers=self._get_headers())
         
         if response.status_code == 201:
             result = response.json()
@@ -136,11 +142,7 @@ class AIAgentsDemo:
         """Executa uma crew de agentes"""
         print(f"👥 Executando crew: {crew_data['name']}...")
         
-        response = await self.client.post(
-            f"{API_BASE_URL}/tasks/execute-crew",
-            json=crew_data,
-            headers=self._get_headers()
-        )
+        response = await self._post_json(f"{API_BASE_URL}/tasks/execute-crew", crew_data, headers=self._get_headers())
         
         if response.status_code == 201:
             result = response.json()
@@ -167,22 +169,15 @@ class AIAgentsDemo:
         """Obtém estatísticas"""
         print("📊 Obtendo estatísticas...")
         
-        # Stats de agentes
-        agents_response = await self.client.get(
-            f"{API_BASE_URL}/agents/stats",
-            headers=self._get_headers()
-        )
-        
-        # Stats de tarefas
-        tasks_response = await self.client.get(
-            f"{API_BASE_URL}/tasks/stats",
-            headers=self._get_headers()
-        )
+        # Método e headers resolvidos uma vez para as três chamadas
+        get = self.client.get
+        headers = self._get_headers()
         
-        # Stats de API keys
-        keys_response = await self.client.get(
-            f"{API_BASE_URL}/api-keys/stats",
-            headers=self._get_headers()
+        # Stats de agentes, tarefas e API keys são independentes: buscar em paralelo
+        agents_response, tasks_response, keys_response = await asyncio.gather(
+            get(f"{API_BASE_URL}/agents/stats", headers=headers),
+            get(f"{API_BASE_URL}/tasks/stats", headers=headers),
+            get(f"{API_BASE_URL}/api-keys/stats", headers=headers)
         )
         
         return {
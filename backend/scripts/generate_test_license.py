@@ -16,6 +16,12 @@ from app.infrastructure.db.database import SessionLocal
 from app.infrastructure.repositories.license_repository import LicenseRepository
 from app.domain.models.license import LicenseType
 
+# Campos comuns a todas as licenças de teste
+_BASE_LICENSE_DATA = {
+    "license_type": LicenseType.PRO,
+    "purchase_platform": "test",
+}
+
 def generate_test_licenses(count: int = 1):
     """Gera licenças de teste"""
     db: Session = SessionLocal()
@@ -24,21 +30,24 @@ def generate_test_licenses(count: int = 1):
     try:
         print(f"Gerando {count} licença(s) de teste...")
         
-        for i in range(count):
-            license_data = {
-                "license_type": LicenseType.PRO,
+        # Um único INSERT em lote (executemany) e um único commit
+        license_keys = license_repo.bulk_create([
+            {
+                **_BASE_LICENSE_DATA,
                 "purchase_email": f"test{i+1}@example.com",
-                "purchase_platform": "test",
                 "purchase_transaction_id": f"TEST-{i+1:04d}"
             }
-            
-            license = license_repo.create(license_data)
-            print(f"✅ Licença {i+1}: {license.license_key}")
+            for i in range(count)
+        ])
+        
+        for i, license_key in enumerate(license_keys, start=1):
+            print(f"✅ Licença {i}: {license_key}")
         
         print(f"\n🎉 {count} licença(s) gerada(s) com sucesso!")
         print("\nVocê pode usar essas chaves para testar o registro de usuários.")
         
     except Exception as e:
+        db.rollback()
         print(f"❌ Erro ao gerar licenças: {e}")
     finally:
         db.close()
@@ -4,18 +4,29 @@ Setup de fixtures e configurações compartilhadas
 """
 
 import asyncio
+import copy
+import logging
+import sys
 import pytest
 import pytest_asyncio
-from typing import AsyncGenerator, Generator
+from types import MappingProxyType
+from typing import AsyncGenerator, Generator, Mapping
+from uuid import uuid4
 from unittest.mock import AsyncMock, MagicMock
 
 import asyncpg
+import orjson
+import redis.asyncio as redis
+from fastapi.testclient import TestClient
+from fakeredis import FakeServer
+from fakeredis.aioredis import FakeRedis
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.pool import StaticPool
 
 from app.core.config import Settings
 from app.infrastructure.database.connection_manager import DatabaseManager
-from app.infrastructure.cache.cache_manager import CacheManager
+from app.infrastructure.cache.cache_manager import CacheManager, cache_manager as global_cache_manager
 from app.domain.entities.user_entity import User, Email, UserProfile, UserSubscription, SubscriptionType
 from app.domain.repositories.user_repository import IUserRepository
 
@@ -29,12 +40,36 @@ class TestSettings(Settings):
     log_level: str = "DEBUG"
 
 
+def pytest_addoption(parser):
+    """Opções de linha de comando dos testes"""
+    parser.addoption(
+        "--no-uvloop",
+        action="store_true",
+        default=False,
+        help="usar o event loop padrão do asyncio em vez do uvloop (debug)"
+    )
+
+
 @pytest.fixture(scope="session")
-def event_loop() -> Generator[asyncio.AbstractEventLoop, None, None]:
-    """Event loop para testes assíncronos"""
-    loop = asyncio.get_event_loop_policy().new_event_loop()
-    yield loop
-    loop.close()
+def event_loop_policy(request) -> asyncio.AbstractEventLoopPolicy:
+    """Política do event loop da sessão: uvloop (já instalado via uvicorn[standard])"""
+    if sys.platform != "win32" and not request.config.getoption("--no-uvloop"):
+        import uvloop
+        return uvloop.EventLoopPolicy()
+    return asyncio.DefaultEventLoopPolicy()
+
+
+@pytest_asyncio.fixture(loop_scope="session", scope="session")
+async def session_loop() -> asyncio.AbstractEventLoop:
+    """Event loop da sessão, para testes síncronos que dirigem corrotinas (ex.: benchmark)"""
+    return asyncio.get_running_loop()
+
+
+_SQLITE_TEST_PRAGMAS = (
+    "PRAGMA journal_mode=MEMORY",
+    "PRAGMA synchronous=OFF",
+    "PRAGMA temp_store=MEMORY",
+)
 
 
 @pytest_asyncio.fixture(scope="session")
@@ -43,7 +78,7 @@ async def test_settings() -> TestSettings:
     return TestSettings()
 
 
-@pytest_asyncio.fixture(scope="session")
+@pytest_asyncio.fixture(loop_scope="session", scope="session")
 async def test_engine(test_settings: TestSettings):
     """Engine de banco para testes"""
     engine = create_async_engine(
@@ -53,6 +88,14 @@ async def test_engine(test_settings: TestSettings):
         echo=False,
     )
     
+    # Sem journal em disco nem fsync: os dados de teste são descartáveis
+    @event.listens_for(engine.sync_engine, "connect")
+    def _configure_sqlite_connection(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma in _SQLITE_TEST_PRAGMAS:
+            cursor.execute(pragma)
+        cursor.close()
+    
     # Criar tabelas (em um projeto real, usar Alembic)
     # async with engine.begin() as conn:
     #     await conn.run_sync(Base.metadata.create_all)
@@ -62,66 +105,231 @@ async def test_engine(test_settings: TestSettings):
     await engine.dispose()
 
 
-@pytest_asyncio.fixture
-async def test_session(test_engine) -> AsyncGenerator[AsyncSession, None]:
-    """Sessão de banco para testes"""
-    session_factory = async_sessionmaker(
+@pytest.fixture(scope="session")
+def test_session_factory(test_engine) -> async_sessionmaker[AsyncSession]:
+    """Fábrica de sessões criada uma vez por sessão de testes"""
+    return async_sessionmaker(
         bind=test_engine,
         class_=AsyncSession,
         expire_on_commit=False
     )
-    
-    async with session_factory() as session:
-        yield session
-        await session.rollback()
 
 
 @pytest_asyncio.fixture
-async def test_cache_manager() -> AsyncGenerator[CacheManager, None]:
-    """Cache manager para testes"""
+async def test_session(
+    test_engine, test_session_factory: async_sessionmaker[AsyncSession]
+) -> AsyncGenerator[AsyncSession, None]:
+    """Sessão de banco para testes (savepoint desfeito ao fim de cada teste)"""
+    async with test_engine.connect() as conn:
+        outer = await conn.begin()
+        session = test_session_factory(bind=conn)
+        await session.begin_nested()
+        
+        yield session
+        
+        await session.close()
+        await outer.rollback()
+
+
+@pytest_asyncio.fixture(loop_scope="session", scope="session")
+async def redis_pool(test_settings: TestSettings) -> AsyncGenerator[redis.ConnectionPool, None]:
+    """Pool Redis único compartilhado por todos os CacheManager dos testes"""
+    pool = redis.ConnectionPool.from_url(
+        test_settings.redis_url,
+        max_connections=32,
+        decode_responses=False
+    )
+    
+    yield pool
+    
+    await pool.disconnect()
+
+
+@pytest_asyncio.fixture(loop_scope="session", scope="session")
+async def shared_cache_manager(redis_pool: redis.ConnectionPool) -> AsyncGenerator[CacheManager, None]:
+    """Cache manager para testes (sobre o pool compartilhado da sessão)"""
     cache_manager = CacheManager()
-    await cache_manager.initialize()
+    cache_manager._redis = redis.Redis(connection_pool=redis_pool)
+    
+    # Decorators e caches de domínio usam a instância global: mesmo pool
+    global_redis = global_cache_manager._redis
+    global_cache_manager._redis = cache_manager._redis
     
     yield cache_manager
     
-    # Limpar cache de teste
-    if cache_manager._redis:
-        await cache_manager._redis.flushdb()
+    global_cache_manager._redis = global_redis
+    # Fecha só o cliente; o pool é desconectado pelo fixture redis_pool
     await cache_manager.close()
 
 
+class NamespacedCacheManager:
+    """Proxy do CacheManager que prefixa as chaves com o namespace do teste"""
+    
+    _KEYED_METHODS = frozenset({
+        "get", "set", "delete", "exists", "increment", "delete_pattern", "get_ttl"
+    })
+    
+    def __init__(self, cache_manager: CacheManager, namespace: str):
+        self._cache_manager = cache_manager
+        self.namespace = namespace
+    
+    def __getattr__(self, name: str):
+        attr = getattr(self._cache_manager, name)
+        if name not in self._KEYED_METHODS:
+            return attr
+        
+        namespace = self.namespace
+        
+        def namespaced(key: str, *args, **kwargs):
+            return attr(namespace + key, *args, **kwargs)
+        
+        return namespaced
+    
+    async def bulk_get(self, keys: list[str]) -> list:
+        namespace = self.namespace
+        return await self._cache_manager.bulk_get([namespace + key for key in keys])
+    
+    async def exists_many(self, keys: list[str]) -> list[bool]:
+        namespace = self.namespace
+        return await self._cache_manager.exists_many([namespace + key for key in keys])
+    
+    async def bulk_set(self, items: dict, ttl: int = None) -> bool:
+        namespace = self.namespace
+        return await self._cache_manager.bulk_set(
+            {namespace + key: value for key, value in items.items()}, ttl
+        )
+
+
+@pytest.fixture
+def cache_ns() -> str:
+    """Prefixo único das chaves escritas por um teste"""
+    return f"t{uuid4().hex}:"
+
+
 @pytest_asyncio.fixture
-async def test_db_manager(test_engine) -> AsyncGenerator[DatabaseManager, None]:
+async def test_cache_manager(
+    shared_cache_manager: CacheManager, cache_ns: str
+) -> AsyncGenerator[NamespacedCacheManager, None]:
+    """Cache manager para testes, isolado por namespace"""
+    yield NamespacedCacheManager(shared_cache_manager, cache_ns)
+    
+    # Remover só as chaves deste teste (UNLINK libera a memória em background)
+    redis_client = shared_cache_manager._redis
+    if redis_client:
+        pipe = redis_client.pipeline(transaction=False)
+        async for key in redis_client.scan_iter(match=f"{cache_ns}*", count=500):
+            pipe.unlink(key)
+        await pipe.execute()
+
+
+@pytest_asyncio.fixture
+async def fake_cache_manager() -> AsyncGenerator[CacheManager, None]:
+    """Cache manager sobre fakeredis (relógio controlável, sem servidor Redis)"""
+    cache_manager = CacheManager()
+    cache_manager._redis = FakeRedis(server=FakeServer())
+    
+    yield cache_manager
+    
+    await cache_manager.close()
+
+
+@pytest_asyncio.fixture(loop_scope="session", scope="session")
+async def test_db_manager(
+    test_engine, test_session_factory: async_sessionmaker[AsyncSession]
+) -> AsyncGenerator[DatabaseManager, None]:
     """Database manager para testes"""
     db_manager = DatabaseManager()
     db_manager.engine = test_engine
-    db_manager.session_factory = async_sessionmaker(
-        bind=test_engine,
-        class_=AsyncSession,
-        expire_on_commit=False
-    )
+    db_manager.session_factory = test_session_factory
     
     yield db_manager
     
     await db_manager.close()
 
 
-# Fixtures de dados de teste
+def fast_json(response) -> object:
+    """Decodifica o corpo JSON de uma resposta com orjson (direto dos bytes)"""
+    return orjson.loads(response.content)
+
+
+# Cliente HTTP da API
+class ListHandler(logging.Handler):
+    """Handler que só acumula os LogRecords emitidos (mais barato que mockar o logger)"""
+    
+    def __init__(self):
+        super().__init__()
+        self.records: list[logging.LogRecord] = []
+    
+    def emit(self, record: logging.LogRecord) -> None:
+        self.records.append(record)
+
+
+@pytest.fixture(scope="session")
+def capture_startup_logs() -> list[logging.LogRecord]:
+    """Registros do logger app.main emitidos no startup (preenchida pelo fixture client)"""
+    return []
+
+
+@pytest.fixture(scope="session")
+def client(capture_startup_logs: list) -> Generator[TestClient, None, None]:
+    """Cliente de teste único da sessão (lifespan e middlewares montados uma vez)"""
+    # Import tardio: testes de domínio e de cache não dependem da aplicação inteira
+    from app.main import app
+    
+    test_client = TestClient(app)
+    
+    # Capturar os logs só durante o lifespan startup
+    app_logger = logging.getLogger("app.main")
+    handler = ListHandler()
+    app_logger.addHandler(handler)
+    try:
+        test_client.__enter__()
+    finally:
+        app_logger.removeHandler(handler)
+    capture_startup_logs.extend(handler.records)
+    
+    try:
+        yield test_client
+    finally:
+        test_client.__exit__(None, None, None)
+
+
 @pytest.fixture
-def sample_user_data() -> dict:
-    """Dados de usuário para testes"""
-    return {
+def app_log_records() -> Generator[list[logging.LogRecord], None, None]:
+    """Registros emitidos pelo logger app.main durante o teste"""
+    app_logger = logging.getLogger("app.main")
+    handler = ListHandler()
+    app_logger.addHandler(handler)
+    try:
+        yield handler.records
+    finally:
+        app_logger.removeHandler(handler)
+
+
+@pytest.fixture(scope="session")
+def openapi_schema(client: TestClient) -> dict:
+    """Schema OpenAPI servido pela API, buscado uma única vez"""
+    response = client.get(client.app.openapi_url)
+    assert response.status_code == 200
+    return fast_json(response)
+
+
+# Fixtures de dados de teste
+@pytest.fixture(scope="session")
+def sample_user_data() -> Mapping[str, str]:
+    """Dados de usuário para testes (somente leitura, criados uma vez)"""
+    return MappingProxyType({
         "email": "test@example.com",
         "first_name": "John",
         "last_name": "Doe",
         "company": "Test Corp",
         "phone": "+1234567890"
-    }
+    })
 
 
-@pytest.fixture
-def sample_user(sample_user_data: dict) -> User:
-    """Usuário de exemplo para testes"""
+@pytest.fixture(scope="session")
+def prototype_user(sample_user_data: Mapping[str, str]) -> User:
+    """Usuário de exemplo construído uma vez (não modificar; usar sample_user)"""
     email = Email(sample_user_data["email"])
     profile = UserProfile(
         first_name=sample_user_data["first_name"],
@@ -134,8 +342,13 @@ def sample_user(sample_user_data: dict) -> User:
 
 
 @pytest.fixture
-def multiple_users() -> list[User]:
-    """Múltiplos usuários para testes"""
+def sample_user(prototype_user: User) -> User:
+    """Usuário de exemplo para testes (cópia independente do protótipo)"""
+    return copy.deepcopy(prototype_user)
+
+
+def _build_multiple_users() -> list[User]:
+    """Monta os usuários de exemplo (alguns com email verificado)"""
     users = []
     
     for i in range(5):
@@ -153,18 +366,47 @@ def multiple_users() -> list[User]:
     return users
 
 
+# Construídos uma única vez na importação do conftest
+_MULTIPLE_USERS = tuple(_build_multiple_users())
+
+
+@pytest.fixture
+def multiple_users() -> tuple[User, ...]:
+    """Múltiplos usuários para testes (compartilhados: não modificar)"""
+    return _MULTIPLE_USERS
+
+
+@pytest.fixture
+def multiple_users_mutable() -> list[User]:
+    """Cópia independente dos usuários para testes que os modificam"""
+    return copy.deepcopy(list(_MULTIPLE_USERS))
+
+
 # Mock repositories
+# Retornos padrão do repositório de usuários (reaplicados a cada teste)
+_MOCK_USER_REPOSITORY_DEFAULTS = {
+    "get_by_id": None,
+    "get_by_email": None,
+    "save": None,
+    "delete": None,
+    "exists": False,
+}
+
+# Mock criado uma única vez (a introspecção do spec é paga só aqui)
+_SHARED_MOCK_USER_REPOSITORY = AsyncMock(spec=IUserRepository)
+for _name, _value in _MOCK_USER_REPOSITORY_DEFAULTS.items():
+    setattr(_SHARED_MOCK_USER_REPOSITORY, _name, AsyncMock(return_value=_value))
+
+
 @pytest.fixture
 def mock_user_repository() -> AsyncMock:
-    """Mock do repositório de usuários"""
-    mock_repo = AsyncMock(spec=IUserRepository)
+    """Mock do repositório de usuários (compartilhado, zerado a cada teste)"""
+    mock_repo = _SHARED_MOCK_USER_REPOSITORY
+    mock_repo.reset_mock(return_value=True, side_effect=True)
     
     # Configurar comportamentos padrão
-    mock_repo.get_by_id.return_value = None
-    mock_repo.get_by_email.return_value = None
-    mock_repo.save.return_value = None
-    mock_repo.delete.return_value = None
-    mock_repo.exists.return_value = False
+    for name, value in _MOCK_USER_REPOSITORY_DEFAULTS.items():
+        getattr(mock_repo, name).return_value = value
     
     return mock_repo
 
@@ -208,7 +450,7 @@ async def integration_setup(test_session, test_cache_manager):
 
 # Markers personalizados
 def pytest_configure(config):
-    """Configuração de markers personalizados"""
+    """Configuração de markers personalizados e do logging dos testes"""
     config.addinivalue_line(
         "markers", "unit: marca testes unitários"
     )
@@ -224,6 +466,18 @@ def pytest_configure(config):
     config.addinivalue_line(
         "markers", "slow: marca testes lentos"
     )
+    
+    # Reduzir verbosidade em testes (uma vez por sessão; use caplog por teste)
+    logging.getLogger("sqlalchemy.engine").setLevel(logging.WARNING)
+    logging.getLogger("asyncio").setLevel(logging.WARNING)
+
+
+def pytest_collection_modifyitems(items):
+    """Roda todos os testes assíncronos no event loop da sessão"""
+    session_marker = pytest.mark.asyncio(loop_scope="session")
+    for item in items:
+        if pytest_asyncio.is_async_test(item):
+            item.add_marker(session_marker, append=False)
 
 
 # Helpers para testes
@@ -247,38 +501,17 @@ class TestHelpers:
         )
     
     @staticmethod
-    async def wait_for_condition(condition_func, timeout: float = 5.0, interval: float = 0.1):
-        """Espera por uma condição em testes assíncronos"""
-        import asyncio
-        
-        start_time = asyncio.get_event_loop().time()
+    async def wait_for_condition(condition_func, timeout: float = 5.0, interval: float = 0.01):
+        """Espera por uma condição (polling para sistemas externos); TimeoutError ao estourar"""
+        async def _poll() -> bool:
+            while not await condition_func():
+                await asyncio.sleep(interval)
+            return True
         
-        while True:
-            if await condition_func():
-                return True
-            
-            if asyncio.get_event_loop().time() - start_time > timeout:
-                return False
-            
-            await asyncio.sleep(interval)
+        return await asyncio.wait_for(_poll(), timeout)
 
 
 @pytest.fixture
 def test_helpers() -> TestHelpers:
     """Helpers para testes"""
     return TestHelpers()
-
-
-# Configuração de logging para testes
-@pytest.fixture(autouse=True)
-def configure_test_logging():
-    """Configura logging para testes"""
-    import logging
-    
-    # Reduzir verbosidade em testes
-    logging.getLogger("sqlalchemy.engine").setLevel(logging.WARNING)
-    logging.getLogger("asyncio").setLevel(logging.WARNING)
-    
-    yield
-    
-    # Cleanup se necessário
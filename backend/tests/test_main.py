@@ -4,21 +4,32 @@ Equivalente aos testes de integração Spring Boot
 """
 
 import pytest
-from fastapi.testclient import TestClient
-from unittest.mock import patch, MagicMock
+from unittest.mock import MagicMock
+import asyncio
+import httpx
+import logging
+import re
 import time
+from types import SimpleNamespace
 
 from app.main import app
 
 
+# Termos que não podem aparecer nos metadados públicos da API
+SENSITIVE_RE = re.compile(r"password|secret|key|token", re.IGNORECASE)
+
+
+@pytest.fixture
+def patched_settings(monkeypatch) -> SimpleNamespace:
+    """Substitui app.main.settings por um objeto simples (desfeito ao fim do teste)"""
+    fake_settings = SimpleNamespace(DEBUG=True)
+    monkeypatch.setattr("app.main.settings", fake_settings)
+    return fake_settings
+
+
 class TestMainAPI:
     """Classe de testes para a API principal"""
     
-    @pytest.fixture
-    def client(self):
-        """Fixture do cliente de teste (equivalente ao TestRestTemplate)"""
-        return TestClient(app)
-    
     def test_health_check_success(self, client):
         """Testa o endpoint de health check - caso de sucesso"""
         response = client.get("/health")
@@ -32,149 +43,124 @@ class TestMainAPI:
         assert "timestamp" in data
         assert isinstance(data["timestamp"], (int, float))
     
-    def test_health_check_response_time(self, client):
-        """Testa se o health check responde rapidamente"""
-        start_time = time.time()
+    @pytest.mark.parametrize(
+        "method,path,expected",
+        [
+            ("GET", "/invalid-endpoint", {404}),  # Endpoint inválido
+            ("OPTIONS", "/health", {200, 405}),  # CORS: 405 é OK para OPTIONS não implementado
+            ("GET", "/docs", {200}),  # Swagger UI
+            ("GET", "/redoc", {200}),  # ReDoc
+        ],
+        ids=["invalid-endpoint-404", "cors-options", "swagger-ui", "redoc"]
+    )
+    def test_basic_endpoint_contract(self, client, method, path, expected):
+        """Testa o status dos endpoints básicos (404, CORS e documentação)"""
+        response = client.request(method, path)
+        assert response.status_code in expected
+    
+    def test_api_documentation_endpoints(self, openapi_schema):
+        """Testa se o schema OpenAPI está acessível (status verificado pelo fixture)"""
+        assert "openapi" in openapi_schema
+        assert "info" in openapi_schema
+    
+    def test_request_logging_middleware(self, client, app_log_records):
+        """Testa se o middleware de logging está funcionando"""
         response = client.get("/health")
-        end_time = time.time()
-        
-        response_time = (end_time - start_time) * 1000  # em ms
         
         assert response.status_code == 200
-        assert response_time < 1000  # Deve responder em menos de 1 segundo
-    
-    def test_cors_headers(self, client):
-        """Testa se os headers CORS estão configurados corretamente"""
-        response = client.options("/health")
         
-        # Verifica se não há erro de CORS
-        assert response.status_code in [200, 405]  # 405 é OK para OPTIONS não implementado
-    
-    def test_api_documentation_endpoints(self, client):
-        """Testa se os endpoints de documentação estão acessíveis"""
-        # Swagger UI
-        docs_response = client.get("/docs")
-        assert docs_response.status_code == 200
-        
-        # ReDoc
-        redoc_response = client.get("/redoc")
-        assert redoc_response.status_code == 200
-        
-        # OpenAPI JSON
-        openapi_response = client.get("/api/v1/openapi.json")
-        assert openapi_response.status_code == 200
-        
-        openapi_data = openapi_response.json()
-        assert "openapi" in openapi_data
-        assert "info" in openapi_data
-    
-    def test_invalid_endpoint_returns_404(self, client):
-        """Testa se endpoints inválidos retornam 404"""
-        response = client.get("/invalid-endpoint")
-        assert response.status_code == 404
-    
-    def test_request_logging_middleware(self, client):
-        """Testa se o middleware de logging está funcionando"""
-        with patch('app.main.logger') as mock_logger:
-            response = client.get("/health")
-            
-            assert response.status_code == 200
-            
-            # Verifica se o logger foi chamado
-            assert mock_logger.info.call_count >= 2  # Request + Response logs
-            
-            # Verifica se os logs contêm informações esperadas
-            call_args = [call.args[0] for call in mock_logger.info.call_args_list]
-            request_logged = any("Request:" in arg for arg in call_args)
-            response_logged = any("Response:" in arg for arg in call_args)
-            
-            assert request_logged
-            assert response_logged
+        # Verifica se o logger foi chamado (uma linha por request)
+        info_records = [record for record in app_log_records if record.levelno == logging.INFO]
+        assert len(info_records) >= 1
+        
+        # Verifica se o log contém método, caminho e status da resposta
+        request_records = [
+            record for record in info_records
+            if "Request:" in record.msg
+        ]
+        
+        assert request_records
+        assert request_records[-1].args[0:3] == ("GET", "/health", 200)
     
-    @patch('app.main.settings')
-    def test_debug_mode_error_details(self, mock_settings, client):
+    def test_debug_mode_error_details(self, patched_settings, monkeypatch, client):
         """Testa se detalhes de erro são mostrados em modo debug"""
-        mock_settings.DEBUG = True
+        patched_settings.DEBUG = True
         
         # Simular um erro interno
-        with patch('app.main.api_router') as mock_router:
-            mock_router.side_effect = Exception("Test error")
-            
-            response = client.get("/api/v1/some-endpoint")
-            
-            # Em modo debug, deve mostrar detalhes do erro
-            if response.status_code == 500:
-                data = response.json()
-                assert "error" in data
+        monkeypatch.setattr("app.main.api_router", MagicMock(side_effect=Exception("Test error")))
+        
+        response = client.get("/api/v1/some-endpoint")
+        
+        # Em modo debug, deve mostrar detalhes do erro
+        if response.status_code == 500:
+            data = response.json()
+            assert "error" in data
     
-    @patch('app.main.settings')
-    def test_production_mode_error_hiding(self, mock_settings, client):
+    def test_production_mode_error_hiding(self, patched_settings, monkeypatch, client):
         """Testa se detalhes de erro são ocultados em produção"""
-        mock_settings.DEBUG = False
+        patched_settings.DEBUG = False
         
         # Simular um erro interno
-        with patch('app.main.api_router') as mock_router:
-            mock_router.side_effect = Exception("Sensitive error info")
-            
-            response = client.get("/api/v1/some-endpoint")
-            
-            # Em produção, não deve mostrar detalhes sensíveis
-            if response.status_code == 500:
-                data = response.json()
-                assert "Sensitive error info" not in str(data)
+        monkeypatch.setattr(
+            "app.main.api_router", MagicMock(side_effect=Exception("Sensitive error info"))
+        )
+        
+        response = client.get("/api/v1/some-endpoint")
+        
+        # Em produção, não deve mostrar detalhes sensíveis
+        if response.status_code == 500:
+            data = response.json()
+            assert "Sensitive error info" not in str(data)
     
-    def test_startup_event_logging(self, client):
+    def test_startup_event_logging(self, client, capture_startup_logs):
         """Testa se o evento de startup registra logs apropriados"""
-        with patch('app.main.logger') as mock_logger:
-            # Simular startup
-            with TestClient(app):
-                pass
-            
-            # Verificar se logs de startup foram registrados
-            startup_calls = [
-                call for call in mock_logger.info.call_args_list 
-                if call.args and "Starting" in call.args[0]
-            ]
-            assert len(startup_calls) > 0
-    
-    def test_api_version_consistency(self, client):
+        # Logs capturados no startup do cliente da sessão (sem um segundo lifespan)
+        startup_records = [
+            record for record in capture_startup_logs
+            if record.levelno == logging.INFO and "Starting" in record.getMessage()
+        ]
+        assert len(startup_records) > 0
+    
+    def test_api_version_consistency(self, client, openapi_schema):
         """Testa se a versão da API é consistente"""
         health_response = client.get("/health")
-        openapi_response = client.get("/api/v1/openapi.json")
         
         assert health_response.status_code == 200
-        assert openapi_response.status_code == 200
         
         health_data = health_response.json()
-        openapi_data = openapi_response.json()
         
         # Versões devem ser consistentes
         health_version = health_data.get("version")
-        openapi_version = openapi_data.get("info", {}).get("version")
+        openapi_version = openapi_schema.get("info", {}).get("version")
         
         if health_version and openapi_version:
             assert health_version == openapi_version
 
 
+@pytest.mark.slow
+@pytest.mark.xdist_group("perf")
 class TestAPIPerformance:
     """Testes de performance da API"""
     
-    @pytest.fixture
-    def client(self):
-        return TestClient(app)
-    
-    def test_health_check_performance(self, client):
+    @pytest.mark.asyncio
+    async def test_health_check_performance(self):
         """Testa performance do health check"""
-        response_times = []
-        
-        # Fazer múltiplas requisições
-        for _ in range(10):
-            start_time = time.time()
-            response = client.get("/health")
-            end_time = time.time()
+        async with httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app), base_url="http://localhost"
+        ) as async_client:
+            async def timed_request():
+                start_time = time.perf_counter()
+                response = await async_client.get("/health")
+                return response.status_code, (time.perf_counter() - start_time) * 1000
             
-            assert response.status_code == 200
-            response_times.append((end_time - start_time) * 1000)
+            # Fazer múltiplas requisições no mesmo event loop
+            results = await asyncio.gather(*[timed_request() for _ in range(10)])
+        
+        assert all(status == 200 for status, _ in results)
+        response_times = [elapsed for _, elapsed in results]
+        
+        # Primeira requisição (inclui montagem do middleware) em menos de 1 segundo
+        assert response_times[0] < 1000
         
         # Calcular estatísticas
         avg_response_time = sum(response_times) / len(response_times)
@@ -184,50 +170,33 @@ class TestAPIPerformance:
         assert avg_response_time < 100  # Média < 100ms
         assert max_response_time < 500  # Máximo < 500ms
     
-    def test_concurrent_requests(self, client):
+    @pytest.mark.asyncio
+    async def test_concurrent_requests(self):
         """Testa requisições concorrentes"""
-        import concurrent.futures
-        import threading
-        
-        def make_request():
-            response = client.get("/health")
-            return response.status_code == 200
-        
-        # Executar requisições concorrentes
-        with concurrent.futures.ThreadPoolExecutor(max_workers=10) as executor:
-            futures = [executor.submit(make_request) for _ in range(20)]
-            results = [future.result() for future in concurrent.futures.as_completed(futures)]
+        async with httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app), base_url="http://localhost"
+        ) as async_client:
+            # Executar requisições concorrentes no mesmo event loop (sem threads)
+            results = await asyncio.gather(*[async_client.get("/health") for _ in range(20)])
         
         # Todas as requisições devem ter sucesso
-        assert all(results)
+        assert all(response.status_code == 200 for response in results)
         assert len(results) == 20
 
 
 class TestAPIConfiguration:
     """Testes de configuração da API"""
     
-    @pytest.fixture
-    def client(self):
-        return TestClient(app)
-    
-    def test_app_metadata(self, client):
+    def test_app_metadata(self, openapi_schema):
         """Testa metadados da aplicação"""
-        response = client.get("/api/v1/openapi.json")
-        assert response.status_code == 200
-        
-        data = response.json()
-        info = data.get("info", {})
+        info = openapi_schema.get("info", {})
         
         assert "title" in info
         assert "version" in info
         assert "description" in info
         
-        # Verificar se não há informações sensíveis
-        sensitive_terms = ["password", "secret", "key", "token"]
-        info_str = str(info).lower()
-        
-        for term in sensitive_terms:
-            assert term not in info_str
+        # Verificar se não há informações sensíveis (uma única varredura)
+        assert not SENSITIVE_RE.search(str(info))
     
     def test_security_headers(self, client):
         """Testa se headers de segurança estão presentes"""
@@ -240,10 +209,9 @@ class TestAPIConfiguration:
         # Em produção, verificar se estão configurados no Nginx/Load Balancer
         assert response.status_code == 200
     
-    @patch('app.main.settings')
-    def test_trusted_hosts_configuration(self, mock_settings, client):
+    def test_trusted_hosts_configuration(self, patched_settings, client):
         """Testa configuração de hosts confiáveis"""
-        mock_settings.DEBUG = False
+        patched_settings.DEBUG = False
         
         # Em produção, deve ter hosts específicos configurados
         response = client.get("/health", headers={"Host": "localhost"})
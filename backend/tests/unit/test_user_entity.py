@@ -7,11 +7,22 @@ import pytest
 from datetime import datetime, timedelta
 from unittest.mock import patch
 
+from freezegun import freeze_time
+
 from app.domain.entities.user_entity import (
     User, Email, UserProfile, UserSubscription, UserStatus, SubscriptionType
 )
 from app.domain.entities.base import BusinessRuleViolationException, DomainEvent
 
+# Relógio congelado: datas relativas exatas e sem chamadas ao relógio do sistema
+FROZEN_NOW = "2024-01-01T00:00:00Z"
+
+
+def _force_lock(user: User) -> None:
+    """Coloca o usuário direto no estado bloqueado (o mecanismo é testado em test_failed_login_attempts)"""
+    user._failed_login_attempts = 5
+    user._locked_until = datetime.utcnow() + timedelta(hours=1)
+
 
 @pytest.mark.unit
 class TestEmail:
@@ -26,6 +37,13 @@ class TestEmail:
         """Testa normalização de email (lowercase)"""
         email = Email("TEST@EXAMPLE.COM")
         assert email.value == "test@example.com"
+        
+        email = Email("First.Last+Tag@Sub.Example.Org")
+        assert email.value == "first.last+tag@sub.example.org"
+        
+        # Maiúsculas não tornam válido um formato inválido
+        with pytest.raises(ValueError, match="Invalid email format"):
+            Email("TEST@EXAMPLE")
     
     def test_invalid_email_raises_error(self):
         """Testa que email inválido gera erro"""
@@ -91,6 +109,7 @@ class TestUserProfile:
 
 
 @pytest.mark.unit
+@freeze_time(FROZEN_NOW)
 class TestUserSubscription:
     """Testes para Value Object UserSubscription"""
     
@@ -130,6 +149,7 @@ class TestUserSubscription:
 
 
 @pytest.mark.unit
+@freeze_time(FROZEN_NOW)
 class TestUser:
     """Testes para entidade User"""
     
@@ -190,7 +210,7 @@ class TestUser:
         assert sample_user._password_hash == password_hash
         
         # Verifica evento gerado
-        events = [e for e in sample_user.domain_events if e.event_type == "password_changed"]
+        events = sample_user.events_of_type("password_changed")
         assert len(events) == 1
     
     def test_set_empty_password_raises_error(self, sample_user):
@@ -210,7 +230,7 @@ class TestUser:
         assert sample_user.status == UserStatus.ACTIVE
         
         # Verifica evento gerado
-        events = [e for e in sample_user.domain_events if e.event_type == "email_verified"]
+        events = sample_user.events_of_type("email_verified")
         assert len(events) == 1
         assert events[0].data["email"] == sample_user.email.value
     
@@ -233,7 +253,7 @@ class TestUser:
         assert sample_user._failed_login_attempts == 0
         
         # Verifica evento gerado
-        events = [e for e in sample_user.domain_events if e.event_type == "user_logged_in"]
+        events = sample_user.events_of_type("user_logged_in")
         assert len(events) == 1
     
     def test_login_inactive_user_raises_error(self, sample_user):
@@ -256,7 +276,7 @@ class TestUser:
         assert sample_user.is_locked is True
         
         # Verifica evento de bloqueio
-        events = [e for e in sample_user.domain_events if e.event_type == "account_locked"]
+        events = sample_user.events_of_type("account_locked")
         assert len(events) == 1
     
     def test_login_locked_account_raises_error(self, sample_user):
@@ -264,8 +284,7 @@ class TestUser:
         sample_user.verify_email()
         
         # Bloquear conta
-        for _ in range(5):
-            sample_user.record_failed_login()
+        _force_lock(sample_user)
         
         with pytest.raises(BusinessRuleViolationException, match="Account is locked"):
             sample_user.record_successful_login()
@@ -275,8 +294,7 @@ class TestUser:
         sample_user.verify_email()
         
         # Bloquear conta
-        for _ in range(5):
-            sample_user.record_failed_login()
+        _force_lock(sample_user)
         
         assert sample_user.is_locked is True
         
@@ -287,7 +305,7 @@ class TestUser:
         assert sample_user._failed_login_attempts == 0
         
         # Verifica evento gerado
-        events = [e for e in sample_user.domain_events if e.event_type == "account_unlocked"]
+        events = sample_user.events_of_type("account_unlocked")
         assert len(events) == 1
     
     def test_upgrade_subscription(self, sample_user):
@@ -302,7 +320,7 @@ class TestUser:
         assert sample_user.subscription.is_trial is False
         
         # Verifica evento gerado
-        events = [e for e in sample_user.domain_events if e.event_type == "subscription_upgraded"]
+        events = sample_user.events_of_type("subscription_upgraded")
         assert len(events) == 1
         assert events[0].data["old_type"] == SubscriptionType.FREE.value
         assert events[0].data["new_type"] == SubscriptionType.PRO.value
@@ -326,7 +344,7 @@ class TestUser:
         assert sample_user.status == UserStatus.SUSPENDED
         
         # Verifica evento gerado
-        events = [e for e in sample_user.domain_events if e.event_type == "user_suspended"]
+        events = sample_user.events_of_type("user_suspended")
         assert len(events) == 1
         assert events[0].data["reason"] == reason
         assert events[0].data["previous_status"] == UserStatus.ACTIVE.value
@@ -341,7 +359,7 @@ class TestUser:
         assert sample_user.status == UserStatus.ACTIVE
         
         # Verifica evento gerado
-        events = [e for e in sample_user.domain_events if e.event_type == "user_reactivated"]
+        events = sample_user.events_of_type("user_reactivated")
         assert len(events) == 1
     
     def test_reactivate_non_suspended_user_raises_error(self, sample_user):
@@ -365,7 +383,7 @@ class TestUser:
         assert sample_user.profile == new_profile
         
         # Verifica evento gerado
-        events = [e for e in sample_user.domain_events if e.event_type == "profile_updated"]
+        events = sample_user.events_of_type("profile_updated")
         assert len(events) == 1
         assert events[0].data["old_name"] == old_name
         assert events[0].data["new_name"] == new_profile.full_name